@@ -0,0 +1,120 @@
+import re
+
+from aiogram.types import InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+
+from app.bot.keyboards import pack_detail_keyboard, pack_link_keyboard, packs_keyboard
+from app.bot.utils import pack_text
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import get_catalog_version, get_pack, get_packs_after, get_packs_before, search_packs
+from app.images import thumbnail_key
+from app.metrics import register_cache
+from app.s3_client import get_s3_client
+
+# Entries are keyed on the catalog version, so any pack change (from the panel or another
+# process) makes every page and pack view miss; the TTL only bounds how long dead keys linger.
+CATALOG_CACHE_TTL = 3600
+# The version itself is re-read at most this often, so a cached page costs no SQLite work and
+# an edit shows up in the bot within a couple of seconds.
+CATALOG_VERSION_CHECK_SECONDS = 2
+SEARCH_MAX_TERMS = 8
+SEARCH_RESULTS_LIMIT = 20
+# Also sent as the inline answer's cache_time, so Telegram and this process expire together.
+SEARCH_CACHE_TIME = 60
+# Thumbnails are fetched by Telegram clients while results sit in Telegram's own cache.
+THUMBNAIL_URL_TTL = 86400
+
+_shop_pages = TTLCache(maxsize=256, ttl=CATALOG_CACHE_TTL)
+_pack_views = TTLCache(maxsize=1024, ttl=CATALOG_CACHE_TTL)
+register_cache("bot_shop_pages", _shop_pages)
+register_cache("bot_pack_views", _pack_views)
+_catalog_version = TTLCache(maxsize=1, ttl=CATALOG_VERSION_CHECK_SECONDS)
+# Keyed by the normalized query only, so a hit costs no SQLite read at all; the short TTL
+# is what bounds staleness after a catalog edit.
+_search_results = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TIME)
+register_cache("bot_inline_search", _search_results)
+
+
+def catalog_version() -> int:
+    version = _catalog_version.get("catalog")
+    if version is None:
+        version = get_catalog_version()
+        _catalog_version.set("catalog", version)
+    return version
+
+
+def _build_shop_page(direction: str, cursor: int | None) -> InlineKeyboardMarkup | None:
+    page_size = max(1, get_settings().BOT_SHOP_PAGE_SIZE)
+    if direction == "prev" and cursor is not None:
+        rows = get_packs_after(cursor, page_size + 1)
+        packs = list(reversed(rows[:page_size]))
+        has_prev, has_next = len(rows) > page_size, True
+    else:
+        rows = get_packs_before(cursor, page_size + 1)
+        packs = rows[:page_size]
+        has_prev, has_next = cursor is not None, len(rows) > page_size
+    if not packs:
+        return None
+    return packs_keyboard(packs, has_prev=has_prev, has_next=has_next).as_markup()
+
+
+def shop_page(direction: str = "next", cursor: int | None = None) -> InlineKeyboardMarkup | None:
+    key = (catalog_version(), direction, cursor)
+    markup = _shop_pages.get(key)
+    if markup is None:
+        markup = _build_shop_page(direction, cursor)
+        if markup is not None:
+            _shop_pages.set(key, markup)
+    return markup
+
+
+def pack_view(pack_id: int) -> tuple[str, InlineKeyboardMarkup] | None:
+    key = (catalog_version(), pack_id)
+    view = _pack_views.get(key)
+    if view is None:
+        pack = get_pack(pack_id)
+        if not pack:
+            return None
+        view = (pack_text(pack), pack_detail_keyboard(pack).as_markup())
+        _pack_views.set(key, view)
+    return view
+
+
+def normalize_query(query: str) -> tuple[str, ...]:
+    return tuple(re.findall(r"\w+", query.lower())[:SEARCH_MAX_TERMS])
+
+
+def _thumbnail_url(pack: dict) -> str | None:
+    cover_key = pack.get("cover_key")
+    if not cover_key:
+        return None
+    widths = pack.get("cover_thumbs") or []
+    key = thumbnail_key(cover_key, widths[0], "jpg") if widths else cover_key
+    s3 = get_s3_client()
+    try:
+        return s3.public_url(key) or s3.generate_download_url(key, expires_in=THUMBNAIL_URL_TTL)
+    except Exception:
+        return None
+
+
+def _search_result(pack: dict, bot_username: str) -> InlineQueryResultArticle:
+    description = (pack.get("description") or "").strip()
+    price = f"from {int(pack.get('price_starter', 100))}⭐"
+    return InlineQueryResultArticle(
+        id=str(pack["id"]),
+        title=pack["name"],
+        description=f"{description[:80]} · {price}" if description else price,
+        thumbnail_url=_thumbnail_url(pack),
+        input_message_content=InputTextMessageContent(message_text=pack_text(pack), parse_mode="HTML"),
+        reply_markup=pack_link_keyboard(pack, bot_username).as_markup(),
+    )
+
+
+def search_results(query: str, bot_username: str) -> list[InlineQueryResultArticle]:
+    key = (bot_username, normalize_query(query))
+    results = _search_results.get(key)
+    if results is None:
+        packs = search_packs(list(key[1]), limit=SEARCH_RESULTS_LIMIT)
+        results = [_search_result(pack, bot_username) for pack in packs]
+        _search_results.set(key, results)
+    return results
@@ -1,15 +1,19 @@
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 
+from app.broadcast import BroadcastRunner
 from app.config import get_settings
 from app.database import (
+    create_broadcast,
+    get_broadcasts,
     get_pack,
     get_purchase_by_id,
     get_stats,
     is_admin,
     update_purchase_status,
 )
+from app.notifications import NotificationWorker, download_link_outbox
 from app.s3_client import get_s3_client
 
 router = Router(name="admin")
@@ -37,7 +41,7 @@ async def cmd_stats(message: Message) -> None:
 
 
 @router.message(Command("confirm"))
-async def cmd_confirm(message: Message) -> None:
+async def cmd_confirm(message: Message, notifier: NotificationWorker | None = None) -> None:
     if not _is_allowed(message.from_user.id):
         return
 
@@ -68,19 +72,18 @@ async def cmd_confirm(message: Message) -> None:
         await message.answer("Could not generate download link.")
         return
 
-    update_purchase_status(purchase_id, "completed")
-
-    try:
-        await message.bot.send_message(
-            purchase["user_id"],
-            "Your purchase was confirmed manually. Download link (valid for 24 hours):\n"
-            f"{url}",
-        )
-    except Exception:
-        await message.answer("Status updated, but the user message was not sent.")
-        return
+    update_purchase_status(
+        purchase_id,
+        "completed",
+        outbox=download_link_outbox(
+            int(purchase["user_id"]),
+            f"Your purchase was confirmed manually. Download link (valid for 24 hours):\n{url}",
+        ),
+    )
+    if notifier is not None:
+        notifier.wake()
 
-    await message.answer("Purchase confirmed and download link sent to user.")
+    await message.answer("Purchase confirmed, download link queued for delivery to user.")
 
 
 @router.message(Command("add_pack"))
@@ -93,3 +96,29 @@ async def cmd_add_pack(message: Message) -> None:
         "Use the web panel to upload new packs:\n"
         f"{settings.PANEL_BASE_URL}/packs/add"
     )
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(
+    message: Message,
+    command: CommandObject,
+    broadcaster: BroadcastRunner | None = None,
+) -> None:
+    if not _is_allowed(message.from_user.id):
+        return
+
+    text = (command.args or "").strip()
+    if not text:
+        recent = get_broadcasts(limit=5)
+        lines = [
+            f"#{b['id']} {b['status']}: {b['delivered']} delivered, {b['blocked']} blocked, {b['failed']} failed"
+            for b in recent
+        ]
+        await message.answer("\n".join(["Usage: /broadcast <text>", *lines]), parse_mode=None)
+        return
+
+    broadcast_id = create_broadcast(text, created_by=message.from_user.id)
+    if broadcaster is not None:
+        broadcaster.wake()
+
+    await message.answer(f"Broadcast #{broadcast_id} queued. You will get a report when it finishes.")
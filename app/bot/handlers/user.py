@@ -1,34 +1,38 @@
 import logging
+import sqlite3
+import time
+from contextlib import suppress
 from datetime import datetime
 
-from aiogram import F, Router
+from aiogram import Bot, F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart
 from aiogram.filters.command import CommandObject
-from aiogram.types import CallbackQuery, LabeledPrice, Message, PreCheckoutQuery
+from aiogram.types import CallbackQuery, InlineQuery, Message, PreCheckoutQuery
 
-from app.bot.keyboards import main_menu_kb, pack_detail_keyboard, packs_keyboard
-from app.bot.utils import build_audio_file, get_bytes_from_s3, is_http_url, pack_text
+from app.bot.catalog import SEARCH_CACHE_TIME, pack_view, search_results, shop_page
+from app.bot.invoices import LICENSE_FIELD, invoice_payload, invoice_prices, parse_invoice_payload
+from app.bot.keyboards import main_menu_kb
+from app.bot.utils import MEDIA_GROUP_LIMIT, fetch_demo_media
 from app.config import get_settings
 from app.database import (
     add_purchase,
+    get_admins,
     get_pack,
-    get_packs,
+    get_pending_purchase,
     get_purchase,
     get_purchase_by_id,
     get_user_purchases,
     update_purchase_status,
 )
+from app.links import free_pack_link
+from app.notifications import NotificationWorker, admin_outbox, download_link_outbox
 from app.s3_client import get_s3_client
+from app.telegram_sender import INTERACTIVE, TRANSACTIONAL, get_sender
 
 router = Router(name="user")
 logger = logging.getLogger(__name__)
 
-LICENSE_FIELD = {
-    "starter": "price_starter",
-    "producer": "price_producer",
-    "collector": "price_collector",
-}
-
 
 def _parse_buy_command(value: str) -> tuple[int, str] | None:
     if not value.startswith("buy_"):
@@ -59,15 +63,19 @@ async def _send_invoice_for_pack(message: Message, pack_id: int, license_type: s
         status="pending",
     )
 
-    payload = f"pack_{pack_id}_{license_type}_{purchase_id}"
-    await message.answer_invoice(
-        title=pack["name"],
-        description=pack.get("description") or "Sample pack",
-        payload=payload,
-        provider_token="",
-        currency="XTR",
-        prices=[LabeledPrice(label=f"Sample Pack ({license_type.title()})", amount=stars_amount)],
-        start_parameter="soundbot_pack",
+    payload = invoice_payload(pack_id, license_type, purchase_id)
+    await get_sender().send(
+        message.chat.id,
+        lambda: message.answer_invoice(
+            title=pack["name"],
+            description=pack.get("description") or "Sample pack",
+            payload=payload,
+            provider_token="",
+            currency="XTR",
+            prices=invoice_prices(license_type, stars_amount),
+            start_parameter="soundbot_pack",
+        ),
+        priority=TRANSACTIONAL,
     )
 
 
@@ -85,24 +93,27 @@ async def cmd_start(message: Message, command: CommandObject) -> None:
 
 @router.message(F.text == "🛍 Shop")
 async def show_shop(message: Message) -> None:
-    packs = get_packs(limit=200, offset=0)
-    if not packs:
+    markup = shop_page()
+    if markup is None:
         await message.answer("No sample packs available yet.")
         return
-    await message.answer("Select a sample pack:", reply_markup=packs_keyboard(packs).as_markup())
+    await message.answer("Select a sample pack:", reply_markup=markup)
 
 
 @router.message(F.text == "🎁 Free pack")
 async def send_free_pack(message: Message) -> None:
-    settings = get_settings()
-    s3 = get_s3_client()
     try:
-        url = s3.generate_download_url(settings.FREE_PACK_KEY, expires_in=86400)
+        url, expires_at = free_pack_link()
     except Exception:
         logger.exception("Failed to generate free pack URL")
         await message.answer("Free pack is temporarily unavailable. Please try later.")
         return
-    await message.answer(f"Your free pack link (valid 24h):\n{url}")
+    hours = max(1, int((expires_at - time.time()) // 3600))
+    await get_sender().send(
+        message.chat.id,
+        lambda: message.answer(f"Your free pack link (valid {hours}h):\n{url}"),
+        priority=TRANSACTIONAL,
+    )
 
 
 @router.message(F.text == "ℹ️ Help")
@@ -126,17 +137,40 @@ async def manual_buy_command(message: Message) -> None:
     await _send_invoice_for_pack(message, pack_id, license_type)
 
 
+@router.callback_query(F.data.regexp(r"^shop:(prev|next):\d+$"))
+async def shop_page_switch(callback: CallbackQuery) -> None:
+    _, direction, cursor = callback.data.split(":")
+    markup = shop_page(direction, int(cursor))
+    if markup is None:
+        # The catalog changed under this keyboard; start over from the newest packs.
+        markup = shop_page()
+    if markup is None:
+        await callback.answer("No sample packs available yet.", show_alert=True)
+        return
+    with suppress(TelegramBadRequest):
+        await callback.message.edit_reply_markup(reply_markup=markup)
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("pack:"))
 async def pack_details(callback: CallbackQuery) -> None:
     pack_id = int(callback.data.split(":")[1])
-    pack = get_pack(pack_id)
-    if not pack:
+    view = pack_view(pack_id)
+    if view is None:
         await callback.answer("Pack not found", show_alert=True)
         return
-    await callback.message.answer(pack_text(pack), reply_markup=pack_detail_keyboard(pack).as_markup())
+    text, markup = view
+    await callback.message.answer(text, reply_markup=markup)
     await callback.answer()
 
 
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery, bot: Bot) -> None:
+    me = await bot.me()
+    results = search_results(inline_query.query, me.username)
+    await inline_query.answer(results, cache_time=SEARCH_CACHE_TIME, is_personal=False)
+
+
 @router.callback_query(F.data.startswith("demo:"))
 async def send_demos(callback: CallbackQuery) -> None:
     pack_id = int(callback.data.split(":")[1])
@@ -151,15 +185,24 @@ async def send_demos(callback: CallbackQuery) -> None:
         await callback.answer()
         return
 
-    for idx, entry in enumerate(demos, start=1):
+    media, failed = await fetch_demo_media(demos, get_settings().BOT_DEMO_CONCURRENCY)
+    incomplete = bool(failed)
+    sender = get_sender()
+    chat_id = callback.message.chat.id
+    for start in range(0, len(media), MEDIA_GROUP_LIMIT):
+        album = media[start : start + MEDIA_GROUP_LIMIT]
         try:
-            if is_http_url(entry):
-                await callback.message.answer_audio(audio=entry)
+            if len(album) == 1:
+                await sender.send(
+                    chat_id, lambda: callback.message.answer_audio(audio=album[0].media), priority=INTERACTIVE
+                )
             else:
-                audio_bytes = get_bytes_from_s3(entry)
-                await callback.message.answer_audio(audio=build_audio_file(audio_bytes, f"demo_{idx}.mp3"))
+                await sender.send(chat_id, lambda: callback.message.answer_media_group(album), priority=INTERACTIVE)
         except Exception:
-            await callback.message.answer(f"Failed to send demo {idx}.")
+            logger.exception("Failed to send demos for pack %s", pack_id)
+            incomplete = True
+    if incomplete:
+        await callback.message.answer("Some demos could not be sent. Please try again later.")
 
     await callback.answer()
 
@@ -178,34 +221,74 @@ async def buy_pack(callback: CallbackQuery) -> None:
 
 @router.pre_checkout_query()
 async def handle_pre_checkout(pre_checkout_query: PreCheckoutQuery) -> None:
+    parsed = parse_invoice_payload(pre_checkout_query.invoice_payload)
+    if parsed and parsed[0] == "link":
+        # Shared invoice links carry the price they were created with; refuse one that
+        # outlived a price change instead of charging the old amount.
+        _, pack_id, license_type, stars_amount = parsed
+        pack = get_pack(pack_id)
+        if not pack or int(pack[LICENSE_FIELD[license_type]]) != stars_amount:
+            await pre_checkout_query.answer(
+                ok=False,
+                error_message="This price has changed. Please reopen the pack and try again.",
+            )
+            return
     await pre_checkout_query.answer(ok=True)
 
 
 @router.message(F.successful_payment)
-async def handle_successful_payment(message: Message) -> None:
+async def handle_successful_payment(message: Message, notifier: NotificationWorker | None = None) -> None:
     payment = message.successful_payment
     if not payment:
         return
 
-    payload = payment.invoice_payload
-    parts = payload.split("_")
-    if len(parts) != 4 or parts[0] != "pack":
+    parsed = parse_invoice_payload(payment.invoice_payload)
+    if not parsed:
         await message.answer("Payment received, but payload is invalid.")
         return
 
-    pack_raw, license_type, purchase_raw = parts[1], parts[2], parts[3]
-    if not pack_raw.isdigit() or not purchase_raw.isdigit() or license_type not in LICENSE_FIELD:
-        await message.answer("Payment received, but payload data is invalid.")
+    # A redelivered payment is already recorded under its charge id; it is only picked up
+    # again if an earlier delivery stopped before completing it.
+    purchase = get_purchase(payment.telegram_payment_charge_id)
+    if purchase is not None and purchase["status"] != "pending":
         return
 
-    pack_id = int(pack_raw)
-    purchase_id = int(purchase_raw)
-    purchase = get_purchase_by_id(purchase_id)
+    kind, pack_id, license_type, ref = parsed
     pack = get_pack(pack_id)
+    if purchase is None and kind == "link":
+        # Paid through a shared invoice link (Mini App): match the order the app created,
+        # or record one, already carrying the charge id, if the link was opened without it.
+        purchase = get_pending_purchase(message.from_user.id, pack_id, license_type, ref, source="app")
+        if purchase is None and pack:
+            try:
+                purchase_id = add_purchase(
+                    message.from_user.id,
+                    pack_id,
+                    license_type,
+                    ref,
+                    status="pending",
+                    telegram_payment_charge_id=payment.telegram_payment_charge_id,
+                    source="app",
+                )
+            except sqlite3.IntegrityError:
+                return
+            purchase = get_purchase_by_id(purchase_id)
+    elif purchase is None:
+        purchase = get_purchase_by_id(ref)
     if not purchase or not pack:
         await message.answer("Payment received, but purchase data is missing.")
         return
+    if purchase["status"] != "pending":
+        logger.warning(
+            "Charge %s paid for purchase %s which is already %s",
+            payment.telegram_payment_charge_id,
+            purchase["id"],
+            purchase["status"],
+        )
+        await message.answer("This order was already processed. Please contact support.")
+        return
 
+    purchase_id = int(purchase["id"])
     expected_amount = int(pack[LICENSE_FIELD[license_type]])
     if int(purchase["stars_amount"]) != expected_amount:
         update_purchase_status(
@@ -213,20 +296,31 @@ async def handle_successful_payment(message: Message) -> None:
             "failed",
             completed_at=datetime.utcnow().isoformat(),
             telegram_payment_charge_id=payment.telegram_payment_charge_id,
+            expected_status="pending",
         )
         await message.answer("Payment amount mismatch. Please contact support.")
         return
 
     s3 = get_s3_client()
     url = s3.generate_download_url(pack["s3_key"], expires_in=86400)
-    update_purchase_status(
+    outbox = download_link_outbox(message.chat.id, f"✅ Payment received! Download link (valid 24h):\n{url}")
+    if kind == "link":
+        # Mini App orders skip the admin ping when created, so it goes out once paid.
+        outbox += admin_outbox(get_settings().ADMIN_IDS + get_admins())
+    # Only a still-pending purchase is completed, so a concurrent delivery or a second
+    # charge can never overwrite the first charge id or queue another link.
+    completed = update_purchase_status(
         purchase_id,
         "completed",
         completed_at=datetime.utcnow().isoformat(),
         telegram_payment_charge_id=payment.telegram_payment_charge_id,
+        outbox=outbox,
+        expected_status="pending",
     )
-
-    await message.answer(f"✅ Payment received! Download link (valid 24h):\n{url}")
+    if not completed:
+        return
+    if notifier is not None:
+        notifier.wake()
 
 
 @router.message(F.text == "My purchases")
@@ -0,0 +1,58 @@
+from aiogram import Bot
+from aiogram.types import LabeledPrice
+
+from app.cache import TTLCache
+from app.metrics import register_cache
+
+LICENSE_FIELD = {
+    "starter": "price_starter",
+    "producer": "price_producer",
+    "collector": "price_collector",
+}
+INVOICE_LINK_TTL = 86400
+
+# One link per pack, license, price and invoice text: the payload carries the price instead of a purchase
+# id, so every buyer can share it and the purchase is resolved at successful_payment.
+_invoice_links = TTLCache(maxsize=1024, ttl=INVOICE_LINK_TTL)
+register_cache("invoice_links", _invoice_links)
+
+
+def invoice_payload(pack_id: int, license_type: str, purchase_id: int) -> str:
+    return f"pack_{pack_id}_{license_type}_{purchase_id}"
+
+
+def invoice_link_payload(pack_id: int, license_type: str, stars_amount: int) -> str:
+    return f"link_{pack_id}_{license_type}_{stars_amount}"
+
+
+def parse_invoice_payload(payload: str) -> tuple[str, int, str, int] | None:
+    parts = payload.split("_")
+    if len(parts) != 4 or parts[0] not in {"pack", "link"}:
+        return None
+    kind, pack_raw, license_type, ref_raw = parts
+    if not pack_raw.isdigit() or not ref_raw.isdigit() or license_type not in LICENSE_FIELD:
+        return None
+    return kind, int(pack_raw), license_type, int(ref_raw)
+
+
+def invoice_prices(license_type: str, stars_amount: int) -> list[LabeledPrice]:
+    return [LabeledPrice(label=f"Sample Pack ({license_type.title()})", amount=stars_amount)]
+
+
+async def get_invoice_link(bot: Bot, pack: dict, license_type: str) -> str:
+    stars_amount = int(pack[LICENSE_FIELD[license_type]])
+    description = pack.get("description") or "Sample pack"
+    # Keyed on everything the invoice shows, so an edited pack gets a fresh link.
+    key = (int(pack["id"]), license_type, stars_amount, pack["name"], description)
+    link = _invoice_links.get(key)
+    if link is None:
+        link = await bot.create_invoice_link(
+            title=pack["name"],
+            description=description,
+            payload=invoice_link_payload(int(pack["id"]), license_type, stars_amount),
+            provider_token="",
+            currency="XTR",
+            prices=invoice_prices(license_type, stars_amount),
+        )
+        _invoice_links.set(key, link)
+    return link
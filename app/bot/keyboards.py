@@ -13,10 +13,18 @@ def main_menu_kb() -> ReplyKeyboardMarkup:
     )
 
 
-def packs_keyboard(packs: list[dict]) -> InlineKeyboardBuilder:
+def packs_keyboard(packs: list[dict], has_prev: bool = False, has_next: bool = False) -> InlineKeyboardBuilder:
     kb = InlineKeyboardBuilder()
     for pack in packs:
         kb.row(InlineKeyboardButton(text=pack["name"], callback_data=f"pack:{pack['id']}"))
+    # Page buttons carry the id at the page edge, so the next page is a keyset query.
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton(text="◀️ Back", callback_data=f"shop:prev:{packs[0]['id']}"))
+    if has_next:
+        nav.append(InlineKeyboardButton(text="More ▶️", callback_data=f"shop:next:{packs[-1]['id']}"))
+    if nav:
+        kb.row(*nav)
     return kb
 
 
@@ -38,3 +46,23 @@ def pack_detail_keyboard(pack: dict) -> InlineKeyboardBuilder:
         InlineKeyboardButton(text=f"Buy Collector ({collector}⭐)", callback_data=f"buy:{pack_id}:collector")
     )
     return kb
+
+
+def pack_link_keyboard(pack: dict, bot_username: str) -> InlineKeyboardBuilder:
+    # Inline results are posted into other chats, where callback buttons would reach the bot
+    # from strangers' messages; deep links open a private chat with the buy command instead.
+    pack_id = int(pack["id"])
+    kb = InlineKeyboardBuilder()
+    for license_type, field, default in (
+        ("starter", "price_starter", 100),
+        ("producer", "price_producer", 300),
+        ("collector", "price_collector", 600),
+    ):
+        price = int(pack.get(field, default))
+        kb.row(
+            InlineKeyboardButton(
+                text=f"Buy {license_type.title()} ({price}⭐)",
+                url=f"https://t.me/{bot_username}?start=buy_{pack_id}_{license_type}",
+            )
+        )
+    return kb
@@ -1,28 +1,88 @@
 import asyncio
+import hashlib
 import logging
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 
 from app.bot.handlers import get_routers
+from app.bot.middlewares import setup_middlewares
+from app.broadcast import BroadcastRunner
 from app.config import get_settings
-from app.database import init_db
+from app.database import count_pending_outbox, init_db
+from app.metrics import register_queue, serve as serve_metrics
+from app.notifications import NotificationWorker
+from app.telegram_sender import register_queue_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def create_bot() -> Bot:
+    settings = get_settings()
+    return Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+
+
+def create_dispatcher(
+    notifier: NotificationWorker | None = None,
+    broadcaster: BroadcastRunner | None = None,
+) -> Dispatcher:
+    dp = Dispatcher()
+    for router in get_routers():
+        dp.include_router(router)
+    setup_middlewares(dp)
+    dp["notifier"] = notifier
+    dp["broadcaster"] = broadcaster
+    return dp
+
+
+def get_webhook_secret() -> str:
+    settings = get_settings()
+    if settings.WEBHOOK_SECRET:
+        return settings.WEBHOOK_SECRET
+    return hashlib.sha256(f"webhook:{settings.BOT_TOKEN}:{settings.WEB_SECRET_KEY}".encode("utf-8")).hexdigest()
+
+
+def get_webhook_url() -> str:
+    settings = get_settings()
+    base_url = settings.WEBHOOK_BASE_URL or settings.PANEL_BASE_URL
+    return f"{base_url.rstrip('/')}{settings.WEBHOOK_PATH}"
 
 
 async def run_bot() -> None:
     settings = get_settings()
     if not settings.BOT_TOKEN:
         raise RuntimeError("BOT_TOKEN is required")
+    if settings.BOT_MODE != "polling":
+        raise RuntimeError("BOT_MODE=webhook: updates are served by the web app, polling is disabled")
 
     init_db()
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher()
+    bot = create_bot()
+    notifier = NotificationWorker(bot)
+    broadcaster = BroadcastRunner(bot)
+    dp = create_dispatcher(notifier, broadcaster)
 
-    for router in get_routers():
-        dp.include_router(router)
+    metrics_server = None
+    if settings.BOT_METRICS_PORT and not settings.METRICS_TOKEN:
+        logger.warning("BOT_METRICS_PORT is set without METRICS_TOKEN; bot metrics are disabled")
+    elif settings.BOT_METRICS_PORT:
+        register_queue("outbox", count_pending_outbox)
+        register_queue("notifications_in_flight", lambda: notifier.in_flight)
+        register_queue("broadcasts_running", lambda: int(broadcaster.current is not None))
+        register_queue_metrics()
+        metrics_server = await serve_metrics("0.0.0.0", settings.BOT_METRICS_PORT, settings.METRICS_TOKEN)
 
-    await dp.start_polling(bot)
+    notifier.start()
+    broadcaster.start()
+    try:
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
+    finally:
+        await broadcaster.stop()
+        await notifier.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
 
 
 def main() -> None:
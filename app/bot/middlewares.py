@@ -0,0 +1,114 @@
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from app.config import get_settings
+from app.metrics import BOT_HANDLER_ERRORS, BOT_HANDLER_SECONDS, BOT_SLOW_UPDATES, BOT_THROTTLED_CALLBACKS
+from app.telegram_sender import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+# Callbacks that hit S3 or open an invoice; browsing the catalog stays unthrottled.
+THROTTLED_PREFIXES = ("demo:", "buy:")
+THROTTLED_TEXT = "Too many requests, please wait a moment."
+
+
+class UpdateTimingMiddleware(BaseMiddleware):
+    # Outer middleware on the update observer: times the whole update, including filters and
+    # other middlewares, and learns which handler ran from HandlerMetricsMiddleware.
+    def __init__(self, slow_seconds: float) -> None:
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        timing = {"handler": "unhandled"}
+        data["update_timing"] = timing
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.slow_seconds:
+                BOT_SLOW_UPDATES.inc(timing["handler"])
+                update_id = event.update_id if isinstance(event, Update) else None
+                logger.warning("Slow update %s handled by %s in %.3fs", update_id, timing["handler"], elapsed)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    # Registered as an inner middleware, so it only runs once filters have picked a
+    # handler and aiogram has put it and its router into the data dict.
+    def __init__(self, event_name: str) -> None:
+        self.event_name = event_name
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        router = data.get("event_router")
+        handler_object = data.get("handler")
+        labels = (
+            getattr(router, "name", "") or "unknown",
+            self.event_name,
+            getattr(getattr(handler_object, "callback", None), "__name__", "unknown"),
+        )
+        timing = data.get("update_timing")
+        if timing is not None:
+            timing["handler"] = f"{labels[0]}.{labels[2]}"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            BOT_HANDLER_ERRORS.inc(*labels)
+            raise
+        finally:
+            BOT_HANDLER_SECONDS.observe(time.perf_counter() - started, *labels)
+
+
+class CallbackThrottleMiddleware(BaseMiddleware):
+    # Outer middleware on callback queries: a rejected press costs one answerCallbackQuery,
+    # no filters, DB reads or S3 downloads.
+    def __init__(self, rate: float, burst: int, max_users: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_users = max(1, max_users)
+        self.buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+
+    def _bucket(self, user_id: int) -> TokenBucket:
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[user_id] = bucket
+            while len(self.buckets) > self.max_users:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(user_id)
+        return bucket
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        if not isinstance(event, CallbackQuery) or not (event.data or "").startswith(THROTTLED_PREFIXES):
+            return await handler(event, data)
+        if self._bucket(event.from_user.id).try_take() > 0:
+            BOT_THROTTLED_CALLBACKS.inc(event.data.split(":", 1)[0])
+            await event.answer(THROTTLED_TEXT)
+            return None
+        return await handler(event, data)
+
+
+def setup_middlewares(dp: Dispatcher) -> None:
+    settings = get_settings()
+    dp.update.outer_middleware(UpdateTimingMiddleware(settings.BOT_SLOW_UPDATE_SECONDS))
+    if settings.BOT_CALLBACK_RATE > 0:
+        dp.callback_query.outer_middleware(
+            CallbackThrottleMiddleware(
+                settings.BOT_CALLBACK_RATE,
+                settings.BOT_CALLBACK_BURST,
+                settings.BOT_THROTTLE_USERS_MAX,
+            )
+        )
+    # Inner middlewares on the dispatcher apply to the handlers of every included router.
+    for event_name, observer in dp.observers.items():
+        if event_name not in {"update", "error"}:
+            observer.middleware(HandlerMetricsMiddleware(event_name))
@@ -1,6 +1,13 @@
-from aiogram.types import BufferedInputFile
+import asyncio
+import logging
 
-from app.s3_client import get_s3_client
+from aiogram.types import BufferedInputFile, InputFile, InputMediaAudio
+
+from app.s3_client import get_async_s3_client
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GROUP_LIMIT = 10
 
 
 def pack_text(pack: dict) -> str:
@@ -14,14 +21,33 @@ def pack_text(pack: dict) -> str:
     )
 
 
-def build_audio_file(raw: bytes, file_name: str) -> BufferedInputFile:
-    return BufferedInputFile(raw, filename=file_name)
-
-
-def get_bytes_from_s3(key: str) -> bytes:
-    s3 = get_s3_client()
-    return s3.download_file(key)
-
-
 def is_http_url(value: str) -> bool:
     return value.startswith("http://") or value.startswith("https://")
+
+
+async def _fetch_demo(entry: str, idx: int, semaphore: asyncio.Semaphore) -> str | InputFile | None:
+    if is_http_url(entry):
+        return entry
+    s3 = get_async_s3_client()
+    public_url = s3.public_url(entry)
+    if public_url:
+        return public_url
+    async with semaphore:
+        try:
+            content = await s3.download_file(entry)
+        except Exception:
+            logger.warning("Failed to fetch demo %s", entry, exc_info=True)
+            return None
+    return BufferedInputFile(content, filename=f"demo_{idx}.mp3")
+
+
+async def fetch_demo_media(demos: list[str], concurrency: int) -> tuple[list[InputMediaAudio], list[int]]:
+    # Private demos are downloaded in parallel so the album is ready after the slowest one,
+    # not after the sum of all of them; public URLs are fetched by Telegram itself.
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    fetched = await asyncio.gather(
+        *(_fetch_demo(entry, idx, semaphore) for idx, entry in enumerate(demos, start=1))
+    )
+    media = [InputMediaAudio(media=item) for item in fetched if item is not None]
+    failed = [idx for idx, item in enumerate(fetched, start=1) if item is None]
+    return media, failed
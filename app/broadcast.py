@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import deque
+from typing import Any
+from uuid import uuid4
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+
+from app.config import get_settings
+from app.database import (
+    checkpoint_broadcast,
+    claim_broadcast,
+    enqueue_outbox,
+    finish_broadcast,
+    get_buyer_ids_after,
+)
+from app.telegram_sender import INFORMATIONAL, get_sender
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ("delivered", "blocked", "failed")
+
+
+def broadcast_report_text(broadcast: dict[str, Any]) -> str:
+    return (
+        f"Broadcast #{broadcast['id']} {broadcast['status']}\n"
+        f"Delivered: {broadcast['delivered']}\n"
+        f"Blocked: {broadcast['blocked']}\n"
+        f"Failed: {broadcast['failed']}"
+    )
+
+
+class _Progress:
+    def __init__(self, broadcast: dict[str, Any]) -> None:
+        self.cursor = int(broadcast["cursor_user_id"])
+        self.counts = {outcome: int(broadcast[outcome]) for outcome in OUTCOMES}
+        self.pending: deque[int] = deque()
+        self.finished: dict[int, str] = {}
+
+    def dispatched(self, user_id: int) -> None:
+        self.pending.append(user_id)
+
+    def done(self, user_id: int, outcome: str) -> None:
+        # Sends complete out of order; only the contiguous prefix of finished ids is
+        # safe to checkpoint, so a restart re-sends at most the in-flight window.
+        self.finished[user_id] = outcome
+        while self.pending and self.pending[0] in self.finished:
+            head = self.pending.popleft()
+            self.counts[self.finished.pop(head)] += 1
+            self.cursor = head
+
+
+class BroadcastRunner:
+    def __init__(self, bot: Bot) -> None:
+        settings = get_settings()
+        self.bot = bot
+        self.sender = get_sender()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.page_size = max(1, settings.BROADCAST_PAGE_SIZE)
+        self.concurrency = max(1, settings.BROADCAST_CONCURRENCY)
+        self.checkpoint_interval = settings.BROADCAST_CHECKPOINT_INTERVAL
+        self.poll_interval = settings.BROADCAST_POLL_INTERVAL
+        self.lease_seconds = settings.BROADCAST_LEASE_SECONDS
+        self.stats = {"runs": 0, "delivered": 0, "blocked": 0, "failed": 0}
+        self.current: int | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def snapshot(self) -> dict[str, int | None]:
+        return {**self.stats, "current": self.current}
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="broadcast-runner")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                broadcast = claim_broadcast(self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim broadcast")
+                broadcast = None
+
+            if broadcast is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.current = broadcast["id"]
+            try:
+                await self.run_broadcast(broadcast)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Broadcast #%s crashed", broadcast["id"])
+            finally:
+                self.current = None
+
+    async def run_broadcast(self, broadcast: dict[str, Any]) -> None:
+        progress = _Progress(broadcast)
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.page_size)
+        stopped = asyncio.Event()
+        self.stats["runs"] += 1
+        logger.info("Broadcast #%s starting after user %s", broadcast["id"], progress.cursor)
+
+        async def produce() -> None:
+            after = progress.cursor
+            while not stopped.is_set():
+                user_ids = get_buyer_ids_after(after, self.page_size)
+                if not user_ids:
+                    break
+                for user_id in user_ids:
+                    await queue.put(user_id)
+                    progress.dispatched(user_id)
+                after = user_ids[-1]
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def consume() -> None:
+            while (user_id := await queue.get()) is not None:
+                if stopped.is_set():
+                    continue
+                outcome = await self._send(user_id, broadcast["text"])
+                self.stats[outcome] += 1
+                progress.done(user_id, outcome)
+
+        async def checkpoint() -> None:
+            while True:
+                await asyncio.sleep(self.checkpoint_interval)
+                if not self._checkpoint(broadcast["id"], progress, self.lease_seconds):
+                    logger.info("Broadcast #%s was cancelled or taken over", broadcast["id"])
+                    stopped.set()
+                    return
+
+        checkpointer = asyncio.create_task(checkpoint())
+        try:
+            await asyncio.gather(produce(), *(consume() for _ in range(self.concurrency)))
+        except asyncio.CancelledError:
+            # Hand the lease back immediately so the next process resumes without waiting it out.
+            self._checkpoint(broadcast["id"], progress, 0)
+            raise
+        finally:
+            checkpointer.cancel()
+
+        if stopped.is_set() or not self._checkpoint(broadcast["id"], progress, self.lease_seconds):
+            return
+        if finish_broadcast(broadcast["id"], self.worker_id):
+            logger.info("Broadcast #%s completed: %s", broadcast["id"], progress.counts)
+            if broadcast.get("created_by"):
+                report = {**broadcast, **progress.counts, "status": "completed"}
+                enqueue_outbox(
+                    "broadcast_report",
+                    int(broadcast["created_by"]),
+                    {"text": broadcast_report_text(report)},
+                    f"broadcast:{broadcast['id']}:report",
+                )
+
+    def _checkpoint(self, broadcast_id: int, progress: _Progress, lease_seconds: float) -> bool:
+        try:
+            return checkpoint_broadcast(
+                broadcast_id,
+                self.worker_id,
+                progress.cursor,
+                lease_seconds=lease_seconds,
+                **progress.counts,
+            )
+        except Exception:
+            logger.exception("Failed to checkpoint broadcast #%s", broadcast_id)
+            return True
+
+    async def _send(self, user_id: int, text: str) -> str:
+        try:
+            await self.sender.send(
+                user_id,
+                lambda: self.bot.send_message(chat_id=user_id, text=text, parse_mode=None),
+                priority=INFORMATIONAL,
+            )
+        except TelegramForbiddenError:
+            return "blocked"
+        except Exception as exc:
+            logger.warning("Broadcast to %s failed: %s", user_id, exc)
+            return "failed"
+        return "delivered"
@@ -1,5 +1,6 @@
 import json
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,21 +12,76 @@ class Settings(BaseSettings):
     BOT_TOKEN: str = ""
     ADMIN_IDS: list[int] = Field(default_factory=list)
 
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    WEBHOOK_BASE_URL: str = ""
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: str = ""
+    WEBHOOK_MAX_CONCURRENCY: int = 32
+
+    STORAGE_BACKEND: Literal["s3", "local"] = "s3"
+    LOCAL_STORAGE_PATH: str = "/data/storage"
+    LOCAL_STORAGE_ACCEL_PREFIX: str = ""
+
     S3_ENDPOINT: str = ""
     S3_ACCESS_KEY: str = ""
     S3_SECRET_KEY: str = ""
     S3_BUCKET: str = ""
     S3_REGION: str = "auto"
     S3_PUBLIC_BASE_URL: str = ""
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_CONNECT_TIMEOUT: float = 5.0
+    S3_READ_TIMEOUT: float = 60.0
+    S3_MAX_ATTEMPTS: int = 5
+    S3_RETRY_MODE: str = "adaptive"
+
+    COVER_THUMBNAIL_WIDTHS: list[int] = Field(default_factory=lambda: [160, 320, 640])
+    IMAGE_WORKERS: int = 2
 
     WEB_PASSWORD: str = "change_me"
     WEB_PORT: int = 8000
+    WEB_WORKERS: int = 1
     WEB_SECRET_KEY: str = "super_secret_session_key"
 
     DATABASE_PATH: str = "/data/app.db"
+    SQLITE_BUSY_TIMEOUT: float = 5.0
+    SQLITE_WRITE_RETRIES: int = 5
     PANEL_BASE_URL: str = "http://localhost:8000"
     FREE_PACK_KEY: str = "free/free_pack.zip"
+    FREE_PACK_LINK_TTL: int = 86400
+    FREE_PACK_REFRESH_FRACTION: float = 0.5
     WEB_APP_URL: str = ""
+    NOTIFY_CONCURRENCY: int = 8
+    NOTIFY_BATCH_SIZE: int = 20
+    NOTIFY_MAX_ATTEMPTS: int = 5
+    NOTIFY_POLL_INTERVAL: float = 2.0
+    NOTIFY_LEASE_SECONDS: float = 60.0
+
+    TG_GLOBAL_RATE: float = 25.0
+    TG_GLOBAL_BURST: float = 25.0
+    TG_CHAT_RATE: float = 1.0
+    TG_CHAT_BURST: float = 3.0
+    TG_CHAT_BUCKETS_MAX: int = 10000
+    TG_MAX_RETRIES: int = 3
+
+    BROADCAST_PAGE_SIZE: int = 500
+    BROADCAST_CONCURRENCY: int = 30
+    BROADCAST_CHECKPOINT_INTERVAL: float = 2.0
+    BROADCAST_POLL_INTERVAL: float = 10.0
+    BROADCAST_LEASE_SECONDS: float = 60.0
+
+    EVENTS_POLL_INTERVAL: float = 1.0
+    EVENTS_HEARTBEAT_INTERVAL: float = 15.0
+    EVENTS_QUEUE_SIZE: int = 100
+
+    BOT_SHOP_PAGE_SIZE: int = 8
+    BOT_DEMO_CONCURRENCY: int = 4
+    BOT_SLOW_UPDATE_SECONDS: float = 1.0
+    BOT_CALLBACK_RATE: float = 0.5
+    BOT_CALLBACK_BURST: int = 3
+    BOT_THROTTLE_USERS_MAX: int = 10000
+
+    METRICS_TOKEN: str = ""
+    BOT_METRICS_PORT: int = 0
 
     @field_validator("ADMIN_IDS", mode="before")
     @classmethod
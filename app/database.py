@@ -1,22 +1,78 @@
 import json
+import logging
+import random
 import sqlite3
-from contextlib import closing
+import time
+from collections.abc import Callable, Iterator
+from contextlib import closing, contextmanager
 from datetime import datetime
-from threading import Lock
 from typing import Any
 
 from app.config import get_settings
+from app.metrics import DB_LOCK_TIMEOUTS, DB_LOCK_WAIT_SECONDS, DB_QUERY_SECONDS, DB_WRITE_SECONDS
 
-_DB_LOCK = Lock()
+logger = logging.getLogger(__name__)
+
+_purchase_listeners: list[Callable[[str, int], None]] = []
+
+
+class _TimedConnection(sqlite3.Connection):
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, sql.lstrip().split(None, 1)[0].upper())
 
 
 def _get_connection() -> sqlite3.Connection:
     settings = get_settings()
-    conn = sqlite3.connect(settings.DATABASE_PATH, check_same_thread=False)
+    conn = sqlite3.connect(
+        settings.DATABASE_PATH,
+        timeout=settings.SQLITE_BUSY_TIMEOUT,
+        check_same_thread=False,
+        factory=_TimedConnection,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
     return conn
 
 
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+@contextmanager
+def _write_transaction() -> Iterator[sqlite3.Connection]:
+    # Writers from the bot process and every uvicorn worker share one file, so the write
+    # lock is taken up front with BEGIN IMMEDIATE instead of upgrading mid-transaction,
+    # which SQLite cannot wait on and would fail with SQLITE_BUSY.
+    retries = max(0, get_settings().SQLITE_WRITE_RETRIES)
+    with closing(_get_connection()) as conn:
+        started = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as exc:
+                if not _is_busy(exc) or attempt == retries:
+                    if _is_busy(exc):
+                        DB_LOCK_TIMEOUTS.inc()
+                    raise
+                time.sleep(min(1.0, 0.05 * 2**attempt) * random.uniform(0.5, 1.0))
+        locked = time.perf_counter()
+        DB_LOCK_WAIT_SECONDS.observe(locked - started)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            DB_WRITE_SECONDS.observe(time.perf_counter() - locked)
+
+
 def _to_dict(row: sqlite3.Row | None) -> dict[str, Any] | None:
     return dict(row) if row else None
 
@@ -39,15 +95,72 @@ def _parse_demo_urls(raw: Any) -> list[str]:
     return []
 
 
+def _parse_widths(raw: Any) -> list[int]:
+    if not raw:
+        return []
+    try:
+        parsed = json.loads(raw) if isinstance(raw, str) else raw
+        return sorted(int(v) for v in parsed)
+    except (TypeError, ValueError):
+        return []
+
+
+def _pack_from_row(row: sqlite3.Row) -> dict[str, Any]:
+    item = dict(row)
+    item["demo_urls"] = _parse_demo_urls(item.get("demo_urls"))
+    item["cover_thumbs"] = _parse_widths(item.get("cover_thumbs"))
+    return item
+
+
+def _ensure_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in columns:
+        try:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError as exc:
+            if "duplicate column" not in str(exc).lower():
+                raise
+
+
+def _drop_legacy_purchases(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(purchases)").fetchall()}
+    if columns and "pack_id" not in columns:
+        conn.execute("DROP TABLE purchases")
+
+
+def _insert_outbox(
+    conn: sqlite3.Connection,
+    messages: list[dict[str, Any]] | None,
+    purchase_id: int | None = None,
+) -> int:
+    inserted = 0
+    now = time.time()
+    for message in messages or []:
+        payload = dict(message.get("payload") or {})
+        if purchase_id is not None:
+            payload.setdefault("purchase_id", int(purchase_id))
+        key = message.get("idempotency_key") or f"{message['kind']}:{purchase_id}:{int(message['chat_id'])}"
+        cur = conn.execute(
+            """
+            INSERT OR IGNORE INTO outbox(idempotency_key, kind, chat_id, payload, available_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (key, message["kind"], int(message["chat_id"]), json.dumps(payload), now, datetime.utcnow().isoformat()),
+        )
+        inserted += cur.rowcount
+    return inserted
+
+
 def init_db() -> None:
     settings = get_settings()
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with closing(_get_connection()) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _drop_legacy_purchases(conn)
         conn.executescript(
             """
             DROP TABLE IF EXISTS orders;
             DROP TABLE IF EXISTS subscriptions;
             DROP TABLE IF EXISTS products;
-            DROP TABLE IF EXISTS purchases;
 
             CREATE TABLE IF NOT EXISTS packs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -58,6 +171,8 @@ def init_db() -> None:
                 price_collector INTEGER NOT NULL,
                 s3_key TEXT NOT NULL,
                 demo_urls TEXT NOT NULL DEFAULT '[]',
+                cover_key TEXT,
+                cover_thumbs TEXT NOT NULL DEFAULT '[]',
                 created_at TEXT NOT NULL
             );
 
@@ -81,15 +196,136 @@ def init_db() -> None:
             CREATE TABLE IF NOT EXISTS admins (
                 user_id INTEGER PRIMARY KEY
             );
+
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                claimed_by TEXT,
+                claimed_until REAL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                delivered_at TEXT
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(status, available_at);
+
+            CREATE INDEX IF NOT EXISTS idx_purchases_status_user_id ON purchases(status, user_id);
+            CREATE INDEX IF NOT EXISTS idx_purchases_completed_at ON purchases(completed_at);
+
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                cursor_user_id INTEGER NOT NULL DEFAULT 0,
+                delivered INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_by INTEGER,
+                claimed_by TEXT,
+                claimed_until REAL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS signed_links (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS versions (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            );
+
+            INSERT OR IGNORE INTO versions(name, value) VALUES ('catalog', 0), ('purchases', 0);
+
+            CREATE TRIGGER IF NOT EXISTS packs_version_insert AFTER INSERT ON packs
+            BEGIN UPDATE versions SET value = value + 1 WHERE name = 'catalog'; END;
+            CREATE TRIGGER IF NOT EXISTS packs_version_update AFTER UPDATE ON packs
+            BEGIN UPDATE versions SET value = value + 1 WHERE name = 'catalog'; END;
+            CREATE TRIGGER IF NOT EXISTS packs_version_delete AFTER DELETE ON packs
+            BEGIN UPDATE versions SET value = value + 1 WHERE name = 'catalog'; END;
+            CREATE TRIGGER IF NOT EXISTS purchases_version_insert AFTER INSERT ON purchases
+            BEGIN UPDATE versions SET value = value + 1 WHERE name = 'purchases'; END;
+            CREATE TRIGGER IF NOT EXISTS purchases_version_update AFTER UPDATE ON purchases
+            BEGIN UPDATE versions SET value = value + 1 WHERE name = 'purchases'; END;
             """
         )
 
+        _ensure_column(conn, "packs", "cover_key", "TEXT")
+        _ensure_column(conn, "packs", "cover_thumbs", "TEXT NOT NULL DEFAULT '[]'")
+        _ensure_column(conn, "purchases", "source", "TEXT NOT NULL DEFAULT 'bot'")
+        _ensure_pack_search(conn)
+
         for admin_id in settings.ADMIN_IDS:
             conn.execute("INSERT OR IGNORE INTO admins(user_id) VALUES (?)", (int(admin_id),))
 
         conn.commit()
 
 
+def _ensure_pack_search(conn: sqlite3.Connection) -> None:
+    # External-content FTS5 index over packs, kept in sync by triggers so every writer
+    # (panel, bot, other workers) updates it in the same transaction as the pack row.
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'packs_fts'").fetchone()
+    conn.executescript(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS packs_fts USING fts5(
+            name, description, content='packs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS packs_fts_insert AFTER INSERT ON packs BEGIN
+            INSERT INTO packs_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS packs_fts_delete AFTER DELETE ON packs BEGIN
+            INSERT INTO packs_fts(packs_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS packs_fts_update AFTER UPDATE OF name, description ON packs BEGIN
+            INSERT INTO packs_fts(packs_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO packs_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END;
+        """
+    )
+    if not exists:
+        conn.execute("INSERT INTO packs_fts(packs_fts) VALUES ('rebuild')")
+
+
+def get_signed_link(key: str) -> dict[str, Any] | None:
+    with closing(_get_connection()) as conn:
+        row = conn.execute("SELECT * FROM signed_links WHERE key = ?", (key,)).fetchone()
+    return _to_dict(row)
+
+
+def save_signed_link(key: str, url: str, expires_at: float) -> None:
+    with _write_transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO signed_links(key, url, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET url = excluded.url, expires_at = excluded.expires_at
+            """,
+            (key, url, float(expires_at)),
+        )
+
+
+def get_version(name: str = "catalog") -> int:
+    with closing(_get_connection()) as conn:
+        row = conn.execute("SELECT value FROM versions WHERE name = ?", (name,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def get_catalog_version() -> int:
+    return get_version("catalog")
+
+
 def add_pack(
     name: str,
     description: str,
@@ -98,16 +334,18 @@ def add_pack(
     price_collector: int,
     s3_key: str,
     demo_urls: list[str] | None = None,
+    cover_key: str | None = None,
 ) -> int:
     now = datetime.utcnow().isoformat()
     payload = json.dumps(demo_urls or [])
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         cur = conn.execute(
             """
             INSERT INTO packs(
-                name, description, price_starter, price_producer, price_collector, s3_key, demo_urls, created_at
+                name, description, price_starter, price_producer, price_collector, s3_key, demo_urls,
+                cover_key, created_at
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 name,
@@ -117,21 +355,19 @@ def add_pack(
                 int(price_collector),
                 s3_key,
                 payload,
+                cover_key,
                 now,
             ),
         )
-        conn.commit()
         return int(cur.lastrowid)
 
 
 def get_pack(pack_id: int) -> dict[str, Any] | None:
     with closing(_get_connection()) as conn:
         row = conn.execute("SELECT * FROM packs WHERE id = ?", (pack_id,)).fetchone()
-    item = _to_dict(row)
-    if not item:
+    if not row:
         return None
-    item["demo_urls"] = _parse_demo_urls(item.get("demo_urls"))
-    return item
+    return _pack_from_row(row)
 
 
 def get_packs(limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
@@ -140,12 +376,50 @@ def get_packs(limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
             "SELECT * FROM packs ORDER BY id DESC LIMIT ? OFFSET ?",
             (int(limit), int(offset)),
         ).fetchall()
-    result: list[dict[str, Any]] = []
-    for row in rows:
-        item = dict(row)
-        item["demo_urls"] = _parse_demo_urls(item.get("demo_urls"))
-        result.append(item)
-    return result
+    return [_pack_from_row(row) for row in rows]
+
+
+def get_packs_before(before_id: int | None, limit: int = 10) -> list[dict[str, Any]]:
+    # Newest first, like get_packs(); before_id=None starts at the newest pack.
+    with closing(_get_connection()) as conn:
+        if before_id is None:
+            rows = conn.execute("SELECT * FROM packs ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM packs WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (int(before_id), int(limit)),
+            ).fetchall()
+    return [_pack_from_row(row) for row in rows]
+
+
+def get_packs_after(after_id: int, limit: int = 10) -> list[dict[str, Any]]:
+    # Oldest first: the page just above after_id when paging back towards the newest packs.
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            "SELECT * FROM packs WHERE id > ? ORDER BY id LIMIT ?",
+            (int(after_id), int(limit)),
+        ).fetchall()
+    return [_pack_from_row(row) for row in rows]
+
+
+def search_packs(terms: list[str], limit: int = 20) -> list[dict[str, Any]]:
+    if not terms:
+        return get_packs(limit=limit, offset=0)
+    # Every term must match as a word prefix; quoting keeps FTS5 syntax out of user input.
+    match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            """
+            SELECT p.*
+            FROM packs_fts
+            JOIN packs p ON p.id = packs_fts.rowid
+            WHERE packs_fts MATCH ?
+            ORDER BY packs_fts.rank
+            LIMIT ?
+            """,
+            (match, int(limit)),
+        ).fetchall()
+    return [_pack_from_row(row) for row in rows]
 
 
 def update_pack(pack_id: int, **fields: Any) -> bool:
@@ -154,22 +428,22 @@ def update_pack(pack_id: int, **fields: Any) -> bool:
 
     if "demo_urls" in fields:
         fields["demo_urls"] = json.dumps(_parse_demo_urls(fields["demo_urls"]))
+    if "cover_thumbs" in fields:
+        fields["cover_thumbs"] = json.dumps(_parse_widths(fields["cover_thumbs"]))
 
     assignments = ", ".join([f"{key} = ?" for key in fields])
     values = [fields[key] for key in fields]
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         cur = conn.execute(
             f"UPDATE packs SET {assignments} WHERE id = ?",
             (*values, int(pack_id)),
         )
-        conn.commit()
         return cur.rowcount > 0
 
 
 def delete_pack(pack_id: int) -> bool:
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         cur = conn.execute("DELETE FROM packs WHERE id = ?", (int(pack_id),))
-        conn.commit()
         return cur.rowcount > 0
 
 
@@ -180,16 +454,18 @@ def add_purchase(
     stars_amount: int,
     status: str = "pending",
     telegram_payment_charge_id: str | None = None,
+    outbox: list[dict[str, Any]] | None = None,
+    source: str = "bot",
 ) -> int:
     now = datetime.utcnow().isoformat()
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         cur = conn.execute(
             """
             INSERT INTO purchases(
                 user_id, pack_id, license_type, stars_amount, status,
-                telegram_payment_charge_id, created_at, completed_at
+                telegram_payment_charge_id, created_at, completed_at, source
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+            VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)
             """,
             (
                 int(user_id),
@@ -199,10 +475,13 @@ def add_purchase(
                 status,
                 telegram_payment_charge_id,
                 now,
+                source,
             ),
         )
-        conn.commit()
-        return int(cur.lastrowid)
+        purchase_id = int(cur.lastrowid)
+        _insert_outbox(conn, outbox, purchase_id)
+    _notify_purchase("purchase_created", purchase_id)
+    return purchase_id
 
 
 def get_purchase(charge_id: str) -> dict[str, Any] | None:
@@ -219,6 +498,29 @@ def get_purchase(charge_id: str) -> dict[str, Any] | None:
     return _to_dict(row)
 
 
+def get_pending_purchase(
+    user_id: int,
+    pack_id: int,
+    license_type: str,
+    stars_amount: int,
+    source: str = "app",
+) -> dict[str, Any] | None:
+    with closing(_get_connection()) as conn:
+        row = conn.execute(
+            """
+            SELECT p.*, k.name AS pack_name
+            FROM purchases p
+            LEFT JOIN packs k ON k.id = p.pack_id
+            WHERE p.user_id = ? AND p.pack_id = ? AND p.license_type = ? AND p.stars_amount = ?
+              AND p.status = 'pending' AND p.source = ?
+            ORDER BY p.id DESC
+            LIMIT 1
+            """,
+            (int(user_id), int(pack_id), license_type, int(stars_amount), source),
+        ).fetchone()
+    return _to_dict(row)
+
+
 def get_purchase_by_id(purchase_id: int) -> dict[str, Any] | None:
     with closing(_get_connection()) as conn:
         row = conn.execute(
@@ -238,22 +540,28 @@ def update_purchase_status(
     status: str,
     completed_at: str | None = None,
     telegram_payment_charge_id: str | None = None,
+    outbox: list[dict[str, Any]] | None = None,
+    expected_status: str | None = None,
 ) -> bool:
     if completed_at is None and status == "completed":
         completed_at = datetime.utcnow().isoformat()
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         cur = conn.execute(
             """
             UPDATE purchases
             SET status = ?,
                 completed_at = ?,
                 telegram_payment_charge_id = COALESCE(?, telegram_payment_charge_id)
-            WHERE id = ?
+            WHERE id = ? AND (? IS NULL OR status = ?)
             """,
-            (status, completed_at, telegram_payment_charge_id, int(purchase_id)),
+            (status, completed_at, telegram_payment_charge_id, int(purchase_id), expected_status, expected_status),
         )
-        conn.commit()
-        return cur.rowcount > 0
+        if cur.rowcount > 0:
+            _insert_outbox(conn, outbox, purchase_id)
+        updated = cur.rowcount > 0
+    if updated and status == "completed":
+        _notify_purchase("purchase_completed", purchase_id)
+    return updated
 
 
 def get_purchases(status: str | None = None, limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
@@ -273,6 +581,99 @@ def get_purchases(status: str | None = None, limit: int = 100, offset: int = 0)
     return [dict(row) for row in rows]
 
 
+def iter_purchases(
+    status: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    batch_size: int = 1000,
+) -> Iterator[dict[str, Any]]:
+    conditions = ["p.id > ?"]
+    filters: list[Any] = []
+    if status:
+        conditions.append("p.status = ?")
+        filters.append(status)
+    if created_from:
+        conditions.append("p.created_at >= ?")
+        filters.append(created_from)
+    if created_to:
+        conditions.append("p.created_at < ?")
+        filters.append(created_to)
+    query = (
+        "SELECT p.*, k.name AS pack_name "
+        "FROM purchases p "
+        "LEFT JOIN packs k ON k.id = p.pack_id "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY p.id LIMIT ?"
+    )
+
+    # Keyset batches keep each read short, so a long export never pins a WAL snapshot.
+    last_id = 0
+    with closing(_get_connection()) as conn:
+        while True:
+            rows = conn.execute(query, [last_id, *filters, int(batch_size)]).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = int(rows[-1]["id"])
+
+
+def get_purchases_after(after_id: int, limit: int = 100) -> list[dict[str, Any]]:
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            """
+            SELECT p.*, k.name AS pack_name
+            FROM purchases p
+            LEFT JOIN packs k ON k.id = p.pack_id
+            WHERE p.id > ?
+            ORDER BY p.id
+            LIMIT ?
+            """,
+            (int(after_id), int(limit)),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_completed_purchases_after(completed_after: str, limit: int = 100) -> list[dict[str, Any]]:
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            """
+            SELECT p.*, k.name AS pack_name
+            FROM purchases p
+            LEFT JOIN packs k ON k.id = p.pack_id
+            WHERE p.status = 'completed' AND p.completed_at > ?
+            ORDER BY p.completed_at, p.id
+            LIMIT ?
+            """,
+            (completed_after, int(limit)),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_purchase_cursors() -> tuple[int, str]:
+    with closing(_get_connection()) as conn:
+        row = conn.execute("SELECT COALESCE(MAX(id), 0), COALESCE(MAX(completed_at), '') FROM purchases").fetchone()
+    return int(row[0]), str(row[1])
+
+
+def add_purchase_listener(listener: Callable[[str, int], None]) -> None:
+    if listener not in _purchase_listeners:
+        _purchase_listeners.append(listener)
+
+
+def remove_purchase_listener(listener: Callable[[str, int], None]) -> None:
+    if listener in _purchase_listeners:
+        _purchase_listeners.remove(listener)
+
+
+def _notify_purchase(event: str, purchase_id: int) -> None:
+    for listener in list(_purchase_listeners):
+        try:
+            listener(event, purchase_id)
+        except Exception:
+            logger.exception("Purchase listener failed for %s #%s", event, purchase_id)
+
+
 def get_user_purchases(user_id: int, limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
     with closing(_get_connection()) as conn:
         rows = conn.execute(
@@ -290,9 +691,8 @@ def get_user_purchases(user_id: int, limit: int = 100, offset: int = 0) -> list[
 
 
 def add_admin(user_id: int) -> None:
-    with _DB_LOCK, closing(_get_connection()) as conn:
+    with _write_transaction() as conn:
         conn.execute("INSERT OR IGNORE INTO admins(user_id) VALUES (?)", (int(user_id),))
-        conn.commit()
 
 
 def get_admins() -> list[int]:
@@ -322,3 +722,191 @@ def get_stats() -> dict[str, int]:
         "purchases_count": purchases_count,
         "revenue_stars": revenue_stars,
     }
+
+
+def enqueue_outbox(
+    kind: str,
+    chat_id: int,
+    payload: dict[str, Any],
+    idempotency_key: str,
+) -> bool:
+    message = {"kind": kind, "chat_id": chat_id, "payload": payload, "idempotency_key": idempotency_key}
+    with _write_transaction() as conn:
+        inserted = _insert_outbox(conn, [message])
+    return inserted > 0
+
+
+def claim_outbox(worker_id: str, limit: int = 20, lease_seconds: float = 60.0) -> list[dict[str, Any]]:
+    now = time.time()
+    with _write_transaction() as conn:
+        rows = conn.execute(
+            """
+            UPDATE outbox
+            SET claimed_by = ?, claimed_until = ?, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE status = 'pending'
+                  AND available_at <= ?
+                  AND (claimed_until IS NULL OR claimed_until < ?)
+                ORDER BY id
+                LIMIT ?
+            )
+            RETURNING *
+            """,
+            (worker_id, now + float(lease_seconds), now, now, int(limit)),
+        ).fetchall()
+    result: list[dict[str, Any]] = []
+    for row in sorted(rows, key=lambda r: r["id"]):
+        item = dict(row)
+        item["payload"] = json.loads(item.get("payload") or "{}")
+        result.append(item)
+    return result
+
+
+def complete_outbox(outbox_id: int, worker_id: str) -> bool:
+    with _write_transaction() as conn:
+        cur = conn.execute(
+            """
+            UPDATE outbox
+            SET status = 'delivered', delivered_at = ?, claimed_by = NULL, claimed_until = NULL
+            WHERE id = ? AND claimed_by = ?
+            """,
+            (datetime.utcnow().isoformat(), int(outbox_id), worker_id),
+        )
+        return cur.rowcount > 0
+
+
+def release_outbox(
+    outbox_id: int,
+    worker_id: str,
+    delay_seconds: float = 0.0,
+    error: str | None = None,
+    failed: bool = False,
+) -> bool:
+    with _write_transaction() as conn:
+        cur = conn.execute(
+            """
+            UPDATE outbox
+            SET status = ?, available_at = ?, last_error = ?, claimed_by = NULL, claimed_until = NULL
+            WHERE id = ? AND claimed_by = ?
+            """,
+            (
+                "failed" if failed else "pending",
+                time.time() + float(delay_seconds),
+                error,
+                int(outbox_id),
+                worker_id,
+            ),
+        )
+        return cur.rowcount > 0
+
+
+def count_pending_outbox() -> int:
+    with closing(_get_connection()) as conn:
+        return int(conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0])
+
+
+def get_buyer_ids_after(after_user_id: int = 0, limit: int = 500) -> list[int]:
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT user_id FROM purchases
+            WHERE status = 'completed' AND user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+            """,
+            (int(after_user_id), int(limit)),
+        ).fetchall()
+    return [int(row[0]) for row in rows]
+
+
+def create_broadcast(text: str, created_by: int | None = None) -> int:
+    with _write_transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO broadcasts(text, created_by, created_at) VALUES (?, ?, ?)",
+            (text, created_by, datetime.utcnow().isoformat()),
+        )
+        return int(cur.lastrowid)
+
+
+def get_broadcast(broadcast_id: int) -> dict[str, Any] | None:
+    with closing(_get_connection()) as conn:
+        row = conn.execute("SELECT * FROM broadcasts WHERE id = ?", (int(broadcast_id),)).fetchone()
+    return _to_dict(row)
+
+
+def get_broadcasts(limit: int = 50, offset: int = 0) -> list[dict[str, Any]]:
+    with closing(_get_connection()) as conn:
+        rows = conn.execute(
+            "SELECT * FROM broadcasts ORDER BY id DESC LIMIT ? OFFSET ?",
+            (int(limit), int(offset)),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def claim_broadcast(worker_id: str, lease_seconds: float = 60.0) -> dict[str, Any] | None:
+    now = time.time()
+    with _write_transaction() as conn:
+        row = conn.execute(
+            """
+            UPDATE broadcasts
+            SET status = 'running',
+                claimed_by = ?,
+                claimed_until = ?,
+                started_at = COALESCE(started_at, ?)
+            WHERE id = (
+                SELECT id FROM broadcasts
+                WHERE status IN ('pending', 'running')
+                  AND (claimed_until IS NULL OR claimed_until < ?)
+                ORDER BY id
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            (worker_id, now + float(lease_seconds), datetime.utcnow().isoformat(), now),
+        ).fetchone()
+    return _to_dict(row)
+
+
+def checkpoint_broadcast(
+    broadcast_id: int,
+    worker_id: str,
+    cursor_user_id: int,
+    delivered: int,
+    blocked: int,
+    failed: int,
+    lease_seconds: float = 60.0,
+) -> bool:
+    with _write_transaction() as conn:
+        cur = conn.execute(
+            """
+            UPDATE broadcasts
+            SET cursor_user_id = ?, delivered = ?, blocked = ?, failed = ?, claimed_until = ?
+            WHERE id = ? AND claimed_by = ? AND status = 'running'
+            """,
+            (
+                int(cursor_user_id),
+                int(delivered),
+                int(blocked),
+                int(failed),
+                time.time() + float(lease_seconds),
+                int(broadcast_id),
+                worker_id,
+            ),
+        )
+        return cur.rowcount > 0
+
+
+def finish_broadcast(broadcast_id: int, worker_id: str | None = None, status: str = "completed") -> bool:
+    query = (
+        "UPDATE broadcasts SET status = ?, finished_at = ?, claimed_by = NULL, claimed_until = NULL "
+        "WHERE id = ? AND status IN ('pending', 'running')"
+    )
+    params: list[Any] = [status, datetime.utcnow().isoformat(), int(broadcast_id)]
+    if worker_id is not None:
+        query += " AND claimed_by = ?"
+        params.append(worker_id)
+    with _write_transaction() as conn:
+        cur = conn.execute(query, params)
+        return cur.rowcount > 0
+
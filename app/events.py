@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any
+
+from app.config import get_settings
+from app.database import (
+    add_purchase_listener,
+    get_completed_purchases_after,
+    get_purchase_by_id,
+    get_purchase_cursors,
+    get_purchases_after,
+    get_stats,
+    get_version,
+    remove_purchase_listener,
+)
+
+logger = logging.getLogger(__name__)
+
+PURCHASE_FIELDS = ("id", "user_id", "pack_id", "pack_name", "license_type", "stars_amount", "status", "created_at")
+PUBLISHED_KEYS_MAX = 1000
+CATCH_UP_BATCH = 100
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    data = json.dumps(event["data"], ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+class Subscription:
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max(2, maxsize))
+        self.dropped = 0
+
+    def push(self, event: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        # A client that cannot keep up loses its backlog and is told to resync instead of
+        # holding memory for every event it has not read yet.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait({"id": event["id"], "type": "resync", "data": {}})
+
+    async def get(self) -> dict[str, Any]:
+        return await self.queue.get()
+
+
+class EventBus:
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.poll_interval = settings.EVENTS_POLL_INTERVAL
+        self.heartbeat_interval = settings.EVENTS_HEARTBEAT_INTERVAL
+        self.queue_size = settings.EVENTS_QUEUE_SIZE
+        self.subscribers: set[Subscription] = set()
+        self.seq = 0
+        self.stats = {"published": 0, "dropped": 0}
+        self._published: OrderedDict[tuple[str, int], None] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._last_id = 0
+        self._last_completed = ""
+        self._versions = (0, 0)
+        self._stopping = False
+
+    def snapshot(self) -> dict[str, int]:
+        dropped = self.stats["dropped"] + sum(sub.dropped for sub in self.subscribers)
+        return {**self.stats, "dropped": dropped, "subscribers": len(self.subscribers)}
+
+    def subscribe(self) -> Subscription:
+        if not self.subscribers and self._task is not None:
+            # Nothing was tracked while nobody listened; start from the current state rather
+            # than replaying everything written in the meantime.
+            self._rebase()
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.stats["dropped"] += subscription.dropped
+        self.subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: dict[str, Any]) -> None:
+        self.seq += 1
+        self.stats["published"] += 1
+        event = {"id": self.seq, "type": event_type, "data": data}
+        for subscription in list(self.subscribers):
+            subscription.push(event)
+
+    def on_purchase(self, event_type: str, purchase_id: int) -> None:
+        # Called by the database write path, possibly from a worker thread.
+        if self._loop is None or not self.subscribers:
+            return
+        purchase = get_purchase_by_id(purchase_id)
+        if purchase is not None:
+            self._loop.call_soon_threadsafe(self._publish_local_purchase, event_type, purchase)
+
+    def _publish_local_purchase(self, event_type: str, purchase: dict[str, Any]) -> None:
+        self._publish_purchase(event_type, purchase)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _publish_purchase(self, event_type: str, purchase: dict[str, Any]) -> None:
+        key = (event_type, int(purchase["id"]))
+        if key in self._published:
+            return
+        self._published[key] = None
+        while len(self._published) > PUBLISHED_KEYS_MAX:
+            self._published.popitem(last=False)
+        self.publish(event_type, {field: purchase.get(field) for field in PURCHASE_FIELDS})
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        add_purchase_listener(self.on_purchase)
+        self._task = asyncio.create_task(self._run(), name="event-bus")
+
+    async def stop(self) -> None:
+        remove_purchase_listener(self.on_purchase)
+        if self._task is None:
+            return
+        # wait_for() may swallow a cancel that races with the wake event, so the loop
+        # also checks an explicit flag.
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    async def _run(self) -> None:
+        # Purchases written by other processes (the polling bot, other uvicorn workers)
+        # never reach this process's listeners; the version counters catch them.
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self.subscribers:
+                continue
+            try:
+                versions = self._read_versions()
+                if versions == self._versions:
+                    continue
+                self._versions = versions
+                self._catch_up()
+                self.publish("stats", get_stats())
+            except Exception:
+                logger.exception("Event bus refresh failed")
+
+    def _rebase(self) -> None:
+        self._last_id, self._last_completed = get_purchase_cursors()
+        self._versions = self._read_versions()
+
+    @staticmethod
+    def _read_versions() -> tuple[int, int]:
+        return get_version("catalog"), get_version("purchases")
+
+    def _catch_up(self) -> None:
+        while True:
+            created = get_purchases_after(self._last_id, CATCH_UP_BATCH)
+            for purchase in created:
+                self._publish_purchase("purchase_created", purchase)
+                self._last_id = int(purchase["id"])
+            if len(created) < CATCH_UP_BATCH:
+                break
+        while True:
+            completed = get_completed_purchases_after(self._last_completed, CATCH_UP_BATCH)
+            for purchase in completed:
+                self._publish_purchase("purchase_completed", purchase)
+                self._last_completed = str(purchase["completed_at"])
+            if len(completed) < CATCH_UP_BATCH:
+                break
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpg": ("JPEG", "image/jpeg"),
+}
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def thumbnail_key(cover_key: str, width: int, ext: str) -> str:
+    stem = cover_key.rsplit(".", 1)[0]
+    return f"{stem}_{int(width)}.{ext}"
+
+
+def render_thumbnails(raw: bytes, widths: list[int]) -> dict[tuple[int, str], bytes]:
+    result: dict[tuple[int, str], bytes] = {}
+    with Image.open(BytesIO(raw)) as source:
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    targets = sorted({int(w) for w in widths if 0 < int(w) <= image.width}) or [image.width]
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for ext, (fmt, _) in THUMBNAIL_FORMATS.items():
+            buffer = BytesIO()
+            if fmt == "JPEG":
+                resized.save(buffer, fmt, quality=82, optimize=True, progressive=True)
+            else:
+                resized.save(buffer, fmt, quality=80, method=4)
+            result[(width, ext)] = buffer.getvalue()
+    return result
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=get_settings().IMAGE_WORKERS)
+    return _executor
+
+
+async def build_thumbnails(raw: bytes, widths: list[int]) -> dict[tuple[int, str], bytes]:
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), render_thumbnails, raw, widths)
+    except Exception:
+        logger.exception("Failed to render cover thumbnails")
+        return {}
+
+
+def shutdown_image_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
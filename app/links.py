@@ -0,0 +1,39 @@
+import time
+
+from app.config import get_settings
+from app.database import get_signed_link, save_signed_link
+from app.metrics import SIGNED_LINK_RENEWALS
+from app.s3_client import get_s3_client
+
+# Links that are the same for every user are signed once and shared: in memory within a
+# process, through the signed_links table across the bot and web processes.
+_links: dict[str, tuple[str, float]] = {}
+
+
+def _fresh(expires_at: float, lifetime: float, refresh_fraction: float, now: float) -> bool:
+    return expires_at - now > lifetime * refresh_fraction
+
+
+def shared_download_link(
+    name: str, key: str, lifetime: int, refresh_fraction: float, now: float | None = None
+) -> tuple[str, float]:
+    now = time.time() if now is None else now
+    cached = _links.get(key)
+    if cached and _fresh(cached[1], lifetime, refresh_fraction, now):
+        return cached
+
+    stored = get_signed_link(key)
+    if stored and _fresh(stored["expires_at"], lifetime, refresh_fraction, now):
+        link = (stored["url"], float(stored["expires_at"]))
+    else:
+        link = (get_s3_client().generate_download_url(key, expires_in=lifetime), now + lifetime)
+        SIGNED_LINK_RENEWALS.inc(name)
+        save_signed_link(key, *link)
+    _links[key] = link
+    return link
+
+
+def free_pack_link(now: float | None = None) -> tuple[str, float]:
+    settings = get_settings()
+    refresh_fraction = min(max(settings.FREE_PACK_REFRESH_FRACTION, 0.0), 0.95)
+    return shared_download_link("free_pack", settings.FREE_PACK_KEY, settings.FREE_PACK_LINK_TTL, refresh_fraction, now)
@@ -0,0 +1,123 @@
+import hashlib
+import hmac
+import json
+import mimetypes
+import mmap
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO
+from urllib.parse import quote, urlencode
+
+from app.config import get_settings
+from app.s3_client import DEFAULT_CHUNK_SIZE, IMMUTABLE_CACHE_CONTROL, SPOOL_MAX_MEMORY, content_key
+
+META_SUFFIX = ".meta.json"
+
+
+class LocalStorage:
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.root = Path(settings.LOCAL_STORAGE_PATH).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = settings.PANEL_BASE_URL.rstrip("/")
+        self._secret = hashlib.sha256(f"local-storage:{settings.WEB_SECRET_KEY}".encode("utf-8")).digest()
+
+    def path_for(self, key: str) -> Path:
+        path = (self.root / key.lstrip("/")).resolve()
+        if path == self.root or self.root not in path.parents or path.name.endswith(META_SUFFIX):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def upload_file(
+        self,
+        file_content: bytes,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+    ) -> str:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(path, file_content)
+        meta = {"content_type": content_type, "cache_control": cache_control}
+        self._write_atomic(path.with_name(path.name + META_SUFFIX), json.dumps(meta).encode("utf-8"))
+        return key
+
+    def upload_immutable(self, file_content: bytes, prefix: str, ext: str, content_type: str) -> str:
+        key = content_key(prefix, file_content, ext)
+        if self.object_exists(key):
+            return key
+        return self.upload_file(file_content, key, content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+
+    def object_exists(self, key: str) -> bool:
+        return self.path_for(key).is_file()
+
+    def public_url(self, key: str) -> str | None:
+        return None
+
+    def generate_download_url(self, key: str, expires_in: int = 3600) -> str:
+        expires = int(time.time()) + int(expires_in)
+        query = urlencode({"expires": expires, "signature": self.sign(key, expires)})
+        return f"{self.base_url}/files/{quote(key)}?{query}"
+
+    def sign(self, key: str, expires: int) -> str:
+        return hmac.new(self._secret, f"{key}:{int(expires)}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def verify(self, key: str, expires: int, signature: str) -> bool:
+        if int(expires) < int(time.time()):
+            return False
+        return hmac.compare_digest(self.sign(key, expires), signature)
+
+    def metadata(self, key: str) -> dict[str, str | None]:
+        path = self.path_for(key)
+        meta: dict[str, str | None] = {"content_type": None, "cache_control": None}
+        try:
+            meta.update(json.loads(path.with_name(path.name + META_SUFFIX).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            pass
+        if not meta["content_type"]:
+            meta["content_type"] = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return meta
+
+    def delete_file(self, key: str) -> None:
+        path = self.path_for(key)
+        path.unlink(missing_ok=True)
+        path.with_name(path.name + META_SUFFIX).unlink(missing_ok=True)
+
+    def download_file(self, key: str) -> bytes:
+        return b"".join(self.iter_chunks(key))
+
+    def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        yield from self.read_range(key, 0, None, chunk_size)
+
+    def read_range(
+        self,
+        key: str,
+        start: int,
+        end: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        with open(self.path_for(key), "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size == 0:
+                return
+            stop = size if end is None else min(int(end) + 1, size)
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(int(start), stop, chunk_size):
+                    yield mapped[offset : min(offset + chunk_size, stop)]
+
+    def spool_to_tempfile(self, key: str, max_memory: int = SPOOL_MAX_MEMORY) -> IO[bytes]:
+        return open(self.path_for(key), "rb")
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+        except Exception:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
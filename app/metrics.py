@@ -0,0 +1,285 @@
+import asyncio
+import hmac
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from app.cache import TTLCache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+_registry: list["Metric"] = []
+_caches: dict[str, TTLCache] = {}
+_queues: dict[str, Callable[[], float]] = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], dict[Labels, float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Values that already live elsewhere (cache counters, queue depths) are read at
+        # scrape time instead of being mirrored on every update.
+        self._collect = collect
+        self._values: dict[Labels, float] = {}
+        _registry.append(self)
+
+    def _label_text(self, labels: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        values = self._collect() if self._collect is not None else self._values
+        for labels, value in list(values.items()):
+            yield f"{self.name}{self._label_text(labels)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+# Updates are plain dict/list arithmetic without a lock: under the GIL a racing increment
+# from a worker thread can at worst be lost, which is fine for monitoring and keeps the
+# request path free of contention.
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: one slot per bucket, one for +Inf, then the running sum.
+        self._series: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0.0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in list(self._series.items()):
+            series = list(series)
+            cumulative = 0.0
+            for bound, observed in zip((*self.buckets, float("inf")), series):
+                cumulative += observed
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{self._label_text(labels, le)} {_format_value(cumulative)}"
+            yield f"{self.name}_sum{self._label_text(labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{self._label_text(labels)} {_format_value(cumulative)}"
+
+
+def register_cache(name: str, cache: TTLCache) -> None:
+    _caches[name] = cache
+
+
+def register_queue(name: str, depth: Callable[[], float]) -> None:
+    _queues[name] = depth
+
+
+def _cache_values(field: str) -> dict[Labels, float]:
+    return {(name,): getattr(cache, field) for name, cache in list(_caches.items())}
+
+
+def _cache_hit_ratios() -> dict[Labels, float]:
+    ratios = {}
+    for name, cache in list(_caches.items()):
+        lookups = cache.hits + cache.misses
+        ratios[(name,)] = cache.hits / lookups if lookups else 0.0
+    return ratios
+
+
+def _queue_depths() -> dict[Labels, float]:
+    depths = {}
+    for name, depth in list(_queues.items()):
+        try:
+            depths[(name,)] = float(depth())
+        except Exception:
+            continue
+    return depths
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in list(_registry)) + "\n"
+
+
+def _authorized(head: bytes, token: str) -> bool:
+    for line in head.decode("latin-1").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "authorization":
+            return hmac.compare_digest(value.strip(), f"Bearer {token}")
+    return False
+
+
+async def serve(host: str, port: int, token: str) -> asyncio.AbstractServer:
+    # The polling bot has no web server of its own; this answers any request carrying
+    # the same bearer token as the web app's /metrics with the exposition text.
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if _authorized(head, token):
+                status, content_type, body = "200 OK", CONTENT_TYPE, render().encode("utf-8")
+            else:
+                status, content_type, body = "401 Unauthorized", "text/plain; charset=utf-8", b"Unauthorized\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n".encode()
+                + f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+BOT_HANDLER_SECONDS = Histogram(
+    "bot_handler_duration_seconds",
+    "aiogram handler latency.",
+    ("router", "event", "handler"),
+)
+BOT_HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "aiogram handlers that raised.",
+    ("router", "event", "handler"),
+)
+BOT_SLOW_UPDATES = Counter(
+    "bot_slow_updates_total",
+    "Updates that took longer than BOT_SLOW_UPDATE_SECONDS end to end.",
+    ("handler",),
+)
+BOT_THROTTLED_CALLBACKS = Counter(
+    "bot_throttled_callbacks_total",
+    "Expensive callback queries rejected by the per-user throttle.",
+    ("action",),
+)
+DB_QUERY_SECONDS = Histogram(
+    "sqlite_query_duration_seconds",
+    "SQLite statement execution time by statement type.",
+    ("statement",),
+)
+DB_LOCK_WAIT_SECONDS = Histogram(
+    "sqlite_write_lock_wait_seconds",
+    "Time spent acquiring the SQLite write lock (BEGIN IMMEDIATE), including retries.",
+)
+DB_WRITE_SECONDS = Histogram(
+    "sqlite_write_transaction_seconds",
+    "Time the SQLite write lock is held, from BEGIN IMMEDIATE to commit or rollback.",
+)
+DB_LOCK_TIMEOUTS = Counter(
+    "sqlite_write_lock_timeouts_total",
+    "Write transactions that gave up waiting for the SQLite write lock.",
+)
+S3_REQUEST_SECONDS = Histogram(
+    "s3_request_duration_seconds",
+    "S3 API call latency by operation and HTTP status, including botocore retries.",
+    ("operation", "status"),
+)
+SIGNED_LINK_RENEWALS = Counter(
+    "signed_link_renewals_total",
+    "Shared download links re-signed because too little of their lifetime was left.",
+    ("link",),
+)
+S3_PRESIGNED_URLS = Counter(
+    "s3_presigned_urls_total",
+    "Presigned S3 URLs generated locally.",
+)
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "In-process cache hits.",
+    ("cache",),
+    collect=lambda: _cache_values("hits"),
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "In-process cache misses.",
+    ("cache",),
+    collect=lambda: _cache_values("misses"),
+)
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio",
+    "Cache hits over lookups since the process started.",
+    ("cache",),
+    collect=_cache_hit_ratios,
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries",
+    "Live cache entries.",
+    ("cache",),
+    collect=lambda: {(name,): len(cache) for name, cache in list(_caches.items())},
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Items waiting in background queues.",
+    ("queue",),
+    collect=_queue_depths,
+)
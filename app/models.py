@@ -19,6 +19,8 @@ class PackUpdate(BaseModel):
     price_collector: int | None = None
     s3_key: str | None = None
     demo_urls: list[str] | None = None
+    cover_key: str | None = None
+    cover_thumbs: list[int] | None = None
 
 
 class PackOut(BaseModel):
@@ -30,6 +32,8 @@ class PackOut(BaseModel):
     price_collector: int
     s3_key: str
     demo_urls: list[str]
+    cover_key: str | None = None
+    cover_thumbs: list[int] = []
     created_at: datetime
 
 
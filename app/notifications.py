@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any
+from uuid import uuid4
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+    TelegramUnauthorizedError,
+)
+
+from app.config import get_settings
+from app.database import (
+    claim_outbox,
+    complete_outbox,
+    count_pending_outbox,
+    enqueue_outbox,
+    get_purchase_by_id,
+    release_outbox,
+)
+from app.telegram_sender import INFORMATIONAL, TRANSACTIONAL, get_sender
+
+logger = logging.getLogger(__name__)
+
+PERMANENT_ERRORS = (TelegramBadRequest, TelegramForbiddenError, TelegramUnauthorizedError)
+
+
+def purchase_admin_text(purchase: dict[str, Any]) -> str:
+    settings = get_settings()
+    return (
+        f"New purchase #{purchase['id']}\n"
+        f"User ID: {purchase['user_id']}\n"
+        f"Pack: {purchase.get('pack_name') or purchase['pack_id']}\n"
+        f"License: {purchase.get('license_type', '-') }\n"
+        f"Stars: {purchase['stars_amount']}\n"
+        f"Status: {purchase['status']}\n"
+        f"Panel: {settings.PANEL_BASE_URL}/orders"
+    )
+
+
+def render_message(kind: str, payload: dict[str, Any]) -> str | None:
+    if kind == "new_purchase":
+        purchase = get_purchase_by_id(int(payload["purchase_id"]))
+        return purchase_admin_text(purchase) if purchase else None
+    return payload.get("text")
+
+
+def admin_outbox(admin_ids: list[int]) -> list[dict[str, Any]]:
+    return [{"kind": "new_purchase", "chat_id": admin_id} for admin_id in sorted(set(admin_ids))]
+
+
+def download_link_outbox(user_id: int, text: str) -> list[dict[str, Any]]:
+    return [{"kind": "download_link", "chat_id": user_id, "payload": {"text": text}}]
+
+
+class NotificationWorker:
+    def __init__(self, bot: Bot) -> None:
+        settings = get_settings()
+        self.bot = bot
+        self.sender = get_sender()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.batch_size = max(1, settings.NOTIFY_BATCH_SIZE)
+        self.max_attempts = max(1, settings.NOTIFY_MAX_ATTEMPTS)
+        self.poll_interval = settings.NOTIFY_POLL_INTERVAL
+        self.lease_seconds = settings.NOTIFY_LEASE_SECONDS
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "duplicates": 0}
+        self._semaphore = asyncio.Semaphore(max(1, settings.NOTIFY_CONCURRENCY))
+        self._wake = asyncio.Event()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return count_pending_outbox()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def snapshot(self) -> dict[str, int]:
+        return {**self.stats, "in_flight": self.in_flight, "depth": self.depth}
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def enqueue(self, kind: str, chat_id: int, text: str, idempotency_key: str | None = None) -> bool:
+        key = idempotency_key or f"{kind}:{uuid4().hex}"
+        if not enqueue_outbox(kind, chat_id, {"text": text}, key):
+            self.stats["duplicates"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        self.wake()
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="notification-worker")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._wake.clear()
+            try:
+                batch = claim_outbox(self.worker_id, self.batch_size, self.lease_seconds)
+            except Exception:
+                logger.exception("Failed to claim outbox messages")
+                batch = []
+
+            if not batch:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._in_flight = len(batch)
+            try:
+                results = await asyncio.gather(*(self._deliver(item) for item in batch), return_exceptions=True)
+            finally:
+                self._in_flight = 0
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Outbox delivery bookkeeping failed", exc_info=result)
+
+    async def _deliver(self, item: dict[str, Any]) -> None:
+        try:
+            text = render_message(item["kind"], item["payload"])
+            if not text:
+                release_outbox(item["id"], self.worker_id, error="nothing to send", failed=True)
+                self.stats["failed"] += 1
+                return
+            priority = TRANSACTIONAL if item["kind"] == "download_link" else INFORMATIONAL
+            async with self._semaphore:
+                await self.sender.send(
+                    item["chat_id"],
+                    lambda: self.bot.send_message(chat_id=item["chat_id"], text=text, parse_mode=None),
+                    priority=priority,
+                )
+        except TelegramRetryAfter as exc:
+            self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+            self._retry(item, exc.retry_after, str(exc))
+        except PERMANENT_ERRORS as exc:
+            self.stats["failed"] += 1
+            logger.warning("Dropping %s for chat %s: %s", item["kind"], item["chat_id"], exc)
+            release_outbox(item["id"], self.worker_id, error=str(exc), failed=True)
+        except Exception as exc:
+            self._retry(item, min(60.0, 2.0 ** item["attempts"]), repr(exc))
+        else:
+            self.stats["sent"] += 1
+            complete_outbox(item["id"], self.worker_id)
+
+    def _retry(self, item: dict[str, Any], delay: float, error: str) -> None:
+        if item["attempts"] >= self.max_attempts:
+            self.stats["failed"] += 1
+            logger.error(
+                "Giving up on %s for chat %s after %s attempts", item["kind"], item["chat_id"], item["attempts"]
+            )
+            release_outbox(item["id"], self.worker_id, error=error, failed=True)
+            return
+        self.stats["retried"] += 1
+        release_outbox(item["id"], self.worker_id, delay_seconds=delay, error=error)
@@ -1,35 +1,129 @@
-from functools import lru_cache
+import asyncio
+import hashlib
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from io import BytesIO
+from typing import IO, Any, Protocol, TypeVar
 
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
 
 from app.config import get_settings
+from app.metrics import S3_PRESIGNED_URLS, S3_REQUEST_SECONDS
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CHUNK_SIZE = 256 * 1024
+SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class StorageBackend(Protocol):
+    def upload_file(
+        self,
+        file_content: bytes,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+    ) -> str: ...
+
+    def upload_immutable(self, file_content: bytes, prefix: str, ext: str, content_type: str) -> str: ...
+
+    def object_exists(self, key: str) -> bool: ...
+
+    def public_url(self, key: str) -> str | None: ...
+
+    def generate_download_url(self, key: str, expires_in: int = 3600) -> str: ...
+
+    def delete_file(self, key: str) -> None: ...
+
+    def download_file(self, key: str) -> bytes: ...
+
+    def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]: ...
+
+    def read_range(
+        self,
+        key: str,
+        start: int,
+        end: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]: ...
+
+    def spool_to_tempfile(self, key: str, max_memory: int = SPOOL_MAX_MEMORY) -> IO[bytes]: ...
+
+
+def content_key(prefix: str, file_content: bytes, ext: str) -> str:
+    digest = hashlib.sha256(file_content).hexdigest()
+    return f"{prefix.rstrip('/')}/{digest}.{ext.lstrip('.').lower()}"
 
 
 class S3Client:
     def __init__(self) -> None:
         settings = get_settings()
         self.bucket = settings.S3_BUCKET
+        self.public_base = settings.S3_PUBLIC_BASE_URL.rstrip("/")
         self.client = boto3.client(
             "s3",
             endpoint_url=settings.S3_ENDPOINT,
             aws_access_key_id=settings.S3_ACCESS_KEY,
             aws_secret_access_key=settings.S3_SECRET_KEY,
             region_name=settings.S3_REGION,
-            config=Config(signature_version="s3v4"),
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT,
+                read_timeout=settings.S3_READ_TIMEOUT,
+                retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": settings.S3_RETRY_MODE},
+            ),
         )
+        events = self.client.meta.events
+        events.register("before-call.s3.*", _start_call_timer)
+        events.register("after-call.s3.*", _observe_call)
+        events.register("after-call-error.s3.*", _observe_call_error)
 
-    def upload_file(self, file_content: bytes, key: str, content_type: str) -> str:
+    def upload_file(
+        self,
+        file_content: bytes,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+    ) -> str:
+        extra = {"CacheControl": cache_control} if cache_control else {}
         self.client.put_object(
             Bucket=self.bucket,
             Key=key,
             Body=file_content,
             ContentType=content_type,
+            **extra,
         )
         return key
 
+    def upload_immutable(self, file_content: bytes, prefix: str, ext: str, content_type: str) -> str:
+        key = content_key(prefix, file_content, ext)
+        if self.object_exists(key):
+            return key
+        return self.upload_file(file_content, key, content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+
+    def object_exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey", "NotFound"}:
+                return False
+            raise
+        return True
+
+    def public_url(self, key: str) -> str | None:
+        if not self.public_base:
+            return None
+        return f"{self.public_base}/{self.bucket}/{key}"
+
     def generate_download_url(self, key: str, expires_in: int = 3600) -> str:
+        S3_PRESIGNED_URLS.inc()
         return self.client.generate_presigned_url(
             "get_object",
             Params={"Bucket": self.bucket, "Key": key},
@@ -46,7 +140,143 @@ class S3Client:
             return body.getvalue()
         return body
 
+    def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        yield from _iter_body(response["Body"], chunk_size)
+
+    def read_range(
+        self,
+        key: str,
+        start: int,
+        end: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        byte_range = f"bytes={int(start)}-{'' if end is None else int(end)}"
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)
+        yield from _iter_body(response["Body"], chunk_size)
+
+    def spool_to_tempfile(self, key: str, max_memory: int = SPOOL_MAX_MEMORY) -> IO[bytes]:
+        spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        try:
+            for chunk in self.iter_chunks(key):
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+
+# botocore hands the same context dict to the before- and after-call hooks of one API
+# call, so the start time rides along with it; these hooks also see botocore's retries.
+def _start_call_timer(context: dict[str, Any], **kwargs: Any) -> None:
+    context["metrics_started"] = time.perf_counter()
+
+
+def _observe_call(model: Any, http_response: Any, context: dict[str, Any], **kwargs: Any) -> None:
+    started = context.pop("metrics_started", None)
+    if started is not None:
+        S3_REQUEST_SECONDS.observe(time.perf_counter() - started, model.name, str(http_response.status_code))
+
+
+def _observe_call_error(event_name: str, context: dict[str, Any], **kwargs: Any) -> None:
+    started = context.pop("metrics_started", None)
+    if started is not None:
+        S3_REQUEST_SECONDS.observe(time.perf_counter() - started, event_name.rsplit(".", 1)[-1], "error")
+
+
+def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+class AsyncS3Client:
+    def __init__(self, client: StorageBackend) -> None:
+        settings = get_settings()
+        self.client = client
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.S3_MAX_POOL_CONNECTIONS,
+            thread_name_prefix="s3",
+        )
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def upload_file(
+        self,
+        file_content: bytes,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+    ) -> str:
+        return await self._run(self.client.upload_file, file_content, key, content_type, cache_control)
+
+    async def upload_immutable(self, file_content: bytes, prefix: str, ext: str, content_type: str) -> str:
+        return await self._run(self.client.upload_immutable, file_content, prefix, ext, content_type)
+
+    async def object_exists(self, key: str) -> bool:
+        return await self._run(self.client.object_exists, key)
+
+    def public_url(self, key: str) -> str | None:
+        return self.client.public_url(key)
+
+    async def generate_download_url(self, key: str, expires_in: int = 3600) -> str:
+        # Presigning is a local HMAC computation, a thread hop would cost more than it saves.
+        return self.client.generate_download_url(key, expires_in=expires_in)
+
+    async def delete_file(self, key: str) -> None:
+        await self._run(self.client.delete_file, key)
+
+    async def download_file(self, key: str) -> bytes:
+        return await self._run(self.client.download_file, key)
+
+    async def iter_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async for chunk in self._aiter(self.client.iter_chunks(key, chunk_size)):
+            yield chunk
+
+    async def read_range(
+        self,
+        key: str,
+        start: int,
+        end: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        async for chunk in self._aiter(self.client.read_range(key, start, end, chunk_size)):
+            yield chunk
+
+    async def spool_to_tempfile(self, key: str, max_memory: int = SPOOL_MAX_MEMORY) -> IO[bytes]:
+        return await self._run(self.client.spool_to_tempfile, key, max_memory)
+
+    async def _aiter(self, chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+        try:
+            while chunk := await self._run(next, chunks, b""):
+                yield chunk
+        finally:
+            await self._run(chunks.close)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
 
 @lru_cache
-def get_s3_client() -> S3Client:
+def get_s3_client() -> StorageBackend:
+    settings = get_settings()
+    if settings.STORAGE_BACKEND == "local":
+        from app.local_storage import LocalStorage
+
+        return LocalStorage()
     return S3Client()
+
+
+@lru_cache
+def get_async_s3_client() -> AsyncS3Client:
+    return AsyncS3Client(get_s3_client())
+
+
+def close_async_s3_client() -> None:
+    if get_async_s3_client.cache_info().currsize:
+        get_async_s3_client().shutdown()
+        get_async_s3_client.cache_clear()
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from functools import lru_cache, partial
+from typing import TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.config import get_settings
+from app.metrics import register_queue
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSACTIONAL = 0
+INTERACTIVE = 1
+INFORMATIONAL = 2
+PRIORITY_NAMES = {TRANSACTIONAL: "transactional", INTERACTIVE: "interactive", INFORMATIONAL: "informational"}
+
+
+# Refill arithmetic on monotonic floats can land a hair under a whole token; treat that as full.
+TOKEN_EPSILON = 1e-9
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1 - TOKEN_EPSILON:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= -TOKEN_EPSILON else -self.tokens / self.rate
+
+    def block(self, seconds: float, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class TelegramSender:
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.global_bucket = TokenBucket(settings.TG_GLOBAL_RATE, settings.TG_GLOBAL_BURST)
+        self.chat_rate = settings.TG_CHAT_RATE
+        self.chat_burst = settings.TG_CHAT_BURST
+        self.max_chat_buckets = max(1, settings.TG_CHAT_BUCKETS_MAX)
+        self.max_retries = max(0, settings.TG_MAX_RETRIES)
+        self.chat_buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self.waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "throttled": 0,
+            "throttle_wait_seconds": 0.0,
+            "retry_after": 0,
+            **{f"sent_{name}": 0 for name in PRIORITY_NAMES.values()},
+        }
+        self._paused_until = 0.0
+
+    def snapshot(self) -> dict[str, float | int]:
+        return {
+            **self.stats,
+            "chat_buckets": len(self.chat_buckets),
+            **{f"waiting_{name}": self.waiting[priority] for priority, name in PRIORITY_NAMES.items()},
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+            while len(self.chat_buckets) > self.max_chat_buckets:
+                self.chat_buckets.popitem(last=False)
+        else:
+            self.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _outranked(self, priority: int) -> bool:
+        return any(self.waiting[other] for other in PRIORITY_NAMES if other < priority)
+
+    async def _acquire(self, chat_id: int, priority: int) -> None:
+        started = time.monotonic()
+        delay = self._chat_bucket(chat_id).reserve(started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self.waiting[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self._outranked(priority):
+                    await asyncio.sleep(1 / self.global_bucket.rate)
+                    continue
+                delay = self.global_bucket.try_take(now)
+                if delay == 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            self.waiting[priority] -= 1
+
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.stats["throttled"] += 1
+            self.stats["throttle_wait_seconds"] += waited
+
+    async def send(
+        self,
+        chat_id: int,
+        call: Callable[[], Awaitable[T]],
+        priority: int = INFORMATIONAL,
+    ) -> T:
+        attempt = 0
+        while True:
+            await self._acquire(int(chat_id), priority)
+            try:
+                result = await call()
+            except TelegramRetryAfter as exc:
+                # Per-chat limits are already enforced locally, so a flood wait means the
+                # bot-wide budget is exhausted: pause every sender, not just this chat.
+                self.stats["retry_after"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + exc.retry_after)
+                self._chat_bucket(int(chat_id)).block(exc.retry_after)
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.stats["failed"] += 1
+                    raise
+                logger.warning("Telegram flood wait %ss for chat %s", exc.retry_after, chat_id)
+                continue
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            self.stats["sent"] += 1
+            self.stats[f"sent_{PRIORITY_NAMES[priority]}"] += 1
+            return result
+
+
+@lru_cache
+def get_sender() -> TelegramSender:
+    return TelegramSender()
+
+
+def _waiting(priority: int) -> int:
+    return get_sender().waiting[priority]
+
+
+def register_queue_metrics() -> None:
+    for priority, name in PRIORITY_NAMES.items():
+        register_queue(f"telegram_{name}", partial(_waiting, priority))
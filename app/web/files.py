@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.s3_client import IMMUTABLE_CACHE_CONTROL
+from app.web.compression import COMPRESSIBLE_TYPES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PRECOMPRESS_MIN_SIZE = 256
+
+
+class SendfileResponse(FileResponse):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        if (
+            "http.response.pathsend" not in extensions
+            or scope["method"].upper() == "HEAD"
+            or "range" in Headers(scope=scope)
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.stat_result is None:
+            self.set_stat_headers(await anyio.to_thread.run_sync(os.stat, self.path))
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": os.fspath(self.path)})
+        if self.background is not None:
+            await self.background()
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    def __init__(self, directory: str, mount_path: str = "/static") -> None:
+        super().__init__(directory=directory)
+        self.mount_path = mount_path.rstrip("/")
+        self.urls: dict[str, str] = {}
+        self.assets: dict[str, tuple[str, str, dict[str, bytes]]] = {}
+        root = Path(directory)
+        for path in sorted(root.rglob("*")):
+            if path.is_file():
+                self._add_asset(path.relative_to(root).as_posix(), path.read_bytes())
+
+    def _add_asset(self, name: str, data: bytes) -> None:
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, dot, ext = name.rpartition(".")
+        hashed = f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        variants = {"identity": data}
+        if media_type in COMPRESSIBLE_TYPES and len(data) >= PRECOMPRESS_MIN_SIZE:
+            variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=11)
+
+        self.urls[name] = hashed
+        self.assets[hashed] = (media_type, f'"{digest}"', variants)
+
+    def url(self, name: str) -> str:
+        return f"{self.mount_path}/{self.urls.get(name, name)}"
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self.assets.get(path)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+
+        media_type, etag, variants = asset
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag, "Vary": "Accept-Encoding"}
+        if etag in request_headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        accepted = request_headers.get("accept-encoding", "")
+        encoding = next((name for name in ("br", "gzip") if name in variants and name in accepted), "identity")
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(variants[encoding], media_type=media_type, headers=headers)
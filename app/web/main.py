@@ -1,107 +1,319 @@
+import asyncio
+import csv
+import hmac
+import io
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
 from typing import Any
+from urllib.parse import quote
 
-from aiogram import Bot
+from aiogram.types import Update
 from fastapi import FastAPI, Form, Request, UploadFile
-from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
 from starlette.middleware.sessions import SessionMiddleware
 
+from app.bot.invoices import get_invoice_link
+from app.bot.main import create_bot, create_dispatcher, get_webhook_secret, get_webhook_url
+from app.bot.utils import is_http_url
+from app.broadcast import BroadcastRunner
+from app.cache import TTLCache
 from app.config import get_settings
 from app.database import (
     add_pack,
     add_purchase,
+    count_pending_outbox,
+    create_broadcast,
     delete_pack,
+    finish_broadcast,
     get_admins,
+    get_broadcasts,
+    get_catalog_version,
     get_purchase_by_id,
     get_purchases,
     get_pack,
     get_packs,
+    get_pending_purchase,
     get_user_purchases,
+    get_version,
     get_stats,
     init_db,
+    iter_purchases,
     update_purchase_status,
     update_pack,
 )
-from app.s3_client import get_s3_client
+from app.events import EventBus, format_sse
+from app.images import THUMBNAIL_FORMATS, build_thumbnails, shutdown_image_pool, thumbnail_key
+from app.local_storage import LocalStorage
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.metrics import register_cache, register_queue, render as render_metrics
+from app.notifications import NotificationWorker, admin_outbox, download_link_outbox
+from app.s3_client import (
+    IMMUTABLE_CACHE_CONTROL,
+    AsyncS3Client,
+    close_async_s3_client,
+    content_key,
+    get_async_s3_client,
+    get_s3_client,
+)
+from app.telegram_sender import get_sender, register_queue_metrics
 from app.web.auth import auth_or_redirect, login_by_password, login_by_telegram_id
+from app.web.compression import CompressionMiddleware
+from app.web.files import FingerprintedStaticFiles, SendfileResponse
+from app.web.metrics import MetricsMiddleware
 from app.web.tg_auth import parse_and_validate_init_data
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
-app = FastAPI(title="Soundbot Admin")
+
+CATALOG_COVER_WIDTH = 320
+HERO_COVER_WIDTH = 640
+# Signed asset URLs live for two windows, so a body cached for one window and revalidated
+# by ETag until the window rolls over never hands out an expired link.
+PRESIGN_WINDOW_SECONDS = 300
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+ORDERS_CACHE_CONTROL = "private, no-cache"
+
+EXPORT_FIELDS = (
+    "id",
+    "user_id",
+    "pack_id",
+    "pack_name",
+    "license_type",
+    "stars_amount",
+    "status",
+    "telegram_payment_charge_id",
+    "created_at",
+    "completed_at",
+)
+EXPORT_FLUSH_ROWS = 500
+
+_api_bodies = TTLCache(maxsize=512, ttl=PRESIGN_WINDOW_SECONDS)
+_catalog_fragments = TTLCache(maxsize=4, ttl=PRESIGN_WINDOW_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    init_db()
+    app.state.bot = create_bot() if settings.BOT_TOKEN else None
+    app.state.notifier = NotificationWorker(app.state.bot) if app.state.bot else None
+    app.state.broadcaster = BroadcastRunner(app.state.bot) if app.state.bot else None
+    app.state.dispatcher = None
+    app.state.events = EventBus()
+    app.state.events.start()
+    app.state.webhook_tasks = set()
+    app.state.webhook_slots = asyncio.Semaphore(max(1, settings.WEBHOOK_MAX_CONCURRENCY))
+    if app.state.bot is not None and settings.BOT_MODE == "webhook":
+        app.state.dispatcher = create_dispatcher(app.state.notifier, app.state.broadcaster)
+        try:
+            await app.state.bot.set_webhook(
+                get_webhook_url(),
+                secret_token=get_webhook_secret(),
+                allowed_updates=app.state.dispatcher.resolve_used_update_types(),
+            )
+        except Exception:
+            logger.exception("Failed to register Telegram webhook")
+    if app.state.notifier is not None:
+        app.state.notifier.start()
+    if app.state.broadcaster is not None:
+        app.state.broadcaster.start()
+    try:
+        yield
+    finally:
+        await app.state.events.stop()
+        if app.state.webhook_tasks:
+            await asyncio.wait(app.state.webhook_tasks, timeout=5.0)
+        if app.state.broadcaster is not None:
+            await app.state.broadcaster.stop()
+        if app.state.notifier is not None:
+            await app.state.notifier.stop()
+        if app.state.bot is not None:
+            await app.state.bot.session.close()
+        shutdown_image_pool()
+        close_async_s3_client()
+
+
+app = FastAPI(title="Soundbot Admin", lifespan=lifespan)
 app.add_middleware(SessionMiddleware, secret_key=settings.WEB_SECRET_KEY)
-app.mount("/static", StaticFiles(directory="app/web/static"), name="static")
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(MetricsMiddleware)
+static_files = FingerprintedStaticFiles(directory="app/web/static")
+app.mount("/static", static_files, name="static")
 templates = Jinja2Templates(directory="app/web/templates")
+templates.env.globals["static_url"] = static_files.url
 
 
-@app.on_event("startup")
-def startup_event() -> None:
-    init_db()
+def _get_notifier() -> NotificationWorker | None:
+    return getattr(app.state, "notifier", None)
 
 
-async def _send_download_link(user_id: int, url: str) -> None:
-    if not settings.BOT_TOKEN:
-        return
+def _wake_notifier() -> None:
+    notifier = _get_notifier()
+    if notifier is not None:
+        notifier.wake()
 
-    bot = Bot(token=settings.BOT_TOKEN)
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=f"Payment confirmed. Download link (24 hours):\n{url}",
-        )
-    finally:
-        await bot.session.close()
 
+def _on_webhook_update_done(task: asyncio.Task) -> None:
+    app.state.webhook_tasks.discard(task)
+    app.state.webhook_slots.release()
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Webhook update handling failed", exc_info=task.exception())
 
-async def _notify_admins(purchase: dict[str, Any], product_name: str = "") -> None:
-    if not settings.BOT_TOKEN:
-        return
 
-    text = (
-        f"New purchase #{purchase['id']}\n"
-        f"User ID: {purchase['user_id']}\n"
-        f"Pack: {product_name or purchase['pack_id']}\n"
-        f"License: {purchase.get('license_type', '-') }\n"
-        f"Stars: {purchase['stars_amount']}\n"
-        f"Status: {purchase['status']}\n"
-        f"Panel: {settings.PANEL_BASE_URL}/orders"
-    )
+def _get_event_bus() -> EventBus | None:
+    return getattr(app.state, "events", None)
 
-    bot = Bot(token=settings.BOT_TOKEN)
-    try:
-        admin_ids = set(settings.ADMIN_IDS + get_admins())
-        for admin_id in admin_ids:
-            try:
-                await bot.send_message(chat_id=admin_id, text=text)
-            except Exception:
-                continue
-    finally:
-        await bot.session.close()
+
+def _get_broadcaster() -> BroadcastRunner | None:
+    return getattr(app.state, "broadcaster", None)
 
 
-def _pack_cover_url(pack: dict[str, Any], expires_in: int = 600) -> str | None:
-    cover_key = f"packs/{pack['id']}/cover.jpg"
+def _notifications_in_flight() -> int:
+    notifier = _get_notifier()
+    return notifier.in_flight if notifier else 0
+
+
+def _broadcasts_running() -> int:
+    broadcaster = _get_broadcaster()
+    return int(broadcaster is not None and broadcaster.current is not None)
+
+
+def _event_subscribers() -> int:
+    events = _get_event_bus()
+    return len(events.subscribers) if events else 0
+
+
+register_cache("api_bodies", _api_bodies)
+register_cache("catalog_fragments", _catalog_fragments)
+register_queue("outbox", count_pending_outbox)
+register_queue("notifications_in_flight", _notifications_in_flight)
+register_queue("broadcasts_running", _broadcasts_running)
+register_queue("event_subscribers", _event_subscribers)
+register_queue_metrics()
+
+
+def _file_ext(filename: str, default: str) -> str:
+    if "." in filename:
+        return filename.rsplit(".", 1)[-1].lower()
+    return default
+
+
+def _pack_cover_key(pack: dict[str, Any]) -> str:
+    return pack.get("cover_key") or f"packs/{pack['id']}/cover.jpg"
+
+
+def _asset_url(key: str, expires_in: int = 600) -> str | None:
     s3 = get_s3_client()
+    public_url = s3.public_url(key)
+    if public_url:
+        return public_url
     try:
-        return s3.generate_download_url(cover_key, expires_in=expires_in)
+        return s3.generate_download_url(key, expires_in=expires_in)
     except Exception:
         return None
 
 
+def _pack_cover_keys(pack: dict[str, Any]) -> list[str]:
+    cover_key = _pack_cover_key(pack)
+    keys = [cover_key]
+    for width in pack.get("cover_thumbs") or []:
+        keys.extend(thumbnail_key(cover_key, width, ext) for ext in THUMBNAIL_FORMATS)
+    return keys
+
+
+def _pack_cover_url(pack: dict[str, Any], expires_in: int = 600, width: int | None = None) -> str | None:
+    cover_key = _pack_cover_key(pack)
+    widths = pack.get("cover_thumbs") or []
+    if width and widths:
+        fit = next((w for w in widths if w >= width), widths[-1])
+        return _asset_url(thumbnail_key(cover_key, fit, "jpg"), expires_in=expires_in)
+    return _asset_url(cover_key, expires_in=expires_in)
+
+
+def _pack_cover_srcset(pack: dict[str, Any], ext: str, expires_in: int = 600) -> str:
+    cover_key = _pack_cover_key(pack)
+    entries: list[str] = []
+    for width in pack.get("cover_thumbs") or []:
+        url = _asset_url(thumbnail_key(cover_key, width, ext), expires_in=expires_in)
+        if url:
+            entries.append(f"{url} {width}w")
+    return ", ".join(entries)
+
+
+def _attach_cover_urls(pack: dict[str, Any], width: int) -> None:
+    pack["cover_url"] = _pack_cover_url(pack, width=width)
+    pack["cover_srcset"] = _pack_cover_srcset(pack, "jpg")
+    pack["cover_webp_srcset"] = _pack_cover_srcset(pack, "webp")
+
+
 def _pack_demo_urls(pack: dict[str, Any], expires_in: int = 600) -> list[str]:
     result: list[str] = []
-    s3 = get_s3_client()
     for entry in pack.get("demo_urls", []) or []:
-        if str(entry).startswith("http://") or str(entry).startswith("https://"):
+        if is_http_url(str(entry)):
             result.append(str(entry))
-        else:
-            try:
-                result.append(s3.generate_download_url(str(entry), expires_in=expires_in))
-            except Exception:
-                continue
+            continue
+        url = _asset_url(str(entry), expires_in=expires_in)
+        if url:
+            result.append(url)
     return result
 
 
+async def _upload_cover(
+    s3: AsyncS3Client,
+    pack_id: int,
+    cover_file: UploadFile,
+    pack: dict[str, Any] | None = None,
+) -> tuple[str, list[int]]:
+    cover_bytes = await cover_file.read()
+    cover_prefix = f"packs/{pack_id}/cover"
+    cover_ext = _file_ext(cover_file.filename or "", "jpg")
+    if pack and pack.get("cover_key") == content_key(cover_prefix, cover_bytes, cover_ext):
+        return pack["cover_key"], pack.get("cover_thumbs") or []
+
+    cover_key = await s3.upload_immutable(cover_bytes, cover_prefix, cover_ext, cover_file.content_type or "image/jpeg")
+    thumbnails = await build_thumbnails(cover_bytes, settings.COVER_THUMBNAIL_WIDTHS)
+    await asyncio.gather(
+        *(
+            s3.upload_file(
+                data,
+                thumbnail_key(cover_key, width, ext),
+                THUMBNAIL_FORMATS[ext][1],
+                cache_control=IMMUTABLE_CACHE_CONTROL,
+            )
+            for (width, ext), data in thumbnails.items()
+        )
+    )
+    return cover_key, sorted({width for width, _ in thumbnails})
+
+
+async def _upload_demos(s3: AsyncS3Client, pack_id: int, demo_files: list[UploadFile] | None) -> list[str]:
+    demo_keys: list[str] = []
+    for demo in demo_files or []:
+        if not demo.filename:
+            continue
+        demo_bytes = await demo.read()
+        demo_key = await s3.upload_immutable(
+            demo_bytes,
+            f"packs/{pack_id}/demos",
+            _file_ext(demo.filename, "mp3"),
+            demo.content_type or "audio/mpeg",
+        )
+        if demo_key not in demo_keys:
+            demo_keys.append(demo_key)
+    return demo_keys
+
+
+async def _delete_keys(s3: AsyncS3Client, keys: list[str]) -> None:
+    targets = {key for key in keys if key and not is_http_url(key)}
+    await asyncio.gather(*(s3.delete_file(key) for key in targets), return_exceptions=True)
+
+
 def _tg_user_id_from_init_data(init_data: str) -> int | None:
     payload = parse_and_validate_init_data(init_data=init_data, bot_token=settings.BOT_TOKEN)
     if not payload:
@@ -109,6 +321,134 @@ def _tg_user_id_from_init_data(init_data: str) -> int | None:
     return int(payload["user_id"])
 
 
+def _presign_window() -> int:
+    return int(time.time()) // PRESIGN_WINDOW_SECONDS
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _cached_json(request: Request, etag: str, cache_control: str, build) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    # One body per ETag per process: signed URLs are only regenerated when the tag changes.
+    body = _api_bodies.get(etag)
+    if body is None:
+        body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        _api_bodies.set(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _pack_api_fields(pack: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": pack["id"],
+        "name": pack["name"],
+        "description": pack.get("description") or "",
+        "price_starter": pack["price_starter"],
+        "price_producer": pack["price_producer"],
+        "price_collector": pack["price_collector"],
+        "cover_url": pack.get("cover_url"),
+        "cover_srcset": pack.get("cover_srcset") or "",
+        "cover_webp_srcset": pack.get("cover_webp_srcset") or "",
+    }
+
+
+def _catalog_packs() -> list[dict[str, Any]]:
+    packs = get_packs(limit=200, offset=0)
+    for pack in packs:
+        _attach_cover_urls(pack, CATALOG_COVER_WIDTH)
+    return packs
+
+
+def _catalog_payload() -> dict[str, Any]:
+    return {"packs": [_pack_api_fields(pack) for pack in _catalog_packs()]}
+
+
+def _catalog_fragment() -> Markup:
+    # The pack grid is the same for every user; only the surrounding shell is per-request.
+    key = (get_catalog_version(), _presign_window())
+    fragment = _catalog_fragments.get(key)
+    if fragment is None:
+        fragment = Markup(templates.get_template("tgapp_catalog.html").render(packs=_catalog_packs()))
+        _catalog_fragments.set(key, fragment)
+    return fragment
+
+
+def _pack_payload(pack: dict[str, Any]) -> dict[str, Any]:
+    _attach_cover_urls(pack, HERO_COVER_WIDTH)
+    return {**_pack_api_fields(pack), "demo_urls": _pack_demo_urls(pack)}
+
+
+def _orders_payload(user_id: int) -> dict[str, Any]:
+    fields = (
+        "id",
+        "pack_id",
+        "pack_name",
+        "license_type",
+        "stars_amount",
+        "status",
+        "telegram_payment_charge_id",
+        "created_at",
+    )
+    orders = get_user_purchases(user_id=user_id, limit=200, offset=0)
+    return {"orders": [{field: order.get(field) for field in fields} for order in orders]}
+
+
+@app.get("/files/{key:path}")
+async def local_storage_file(key: str, expires: int = 0, signature: str = ""):
+    storage = get_s3_client()
+    if not isinstance(storage, LocalStorage):
+        return Response(status_code=404)
+
+    try:
+        path = storage.path_for(key)
+    except ValueError:
+        return Response(status_code=404)
+    if not storage.verify(key, expires, signature):
+        return Response(status_code=403)
+    if not path.is_file():
+        return Response(status_code=404)
+
+    meta = storage.metadata(key)
+    headers = {"Cache-Control": meta["cache_control"] or f"private, max-age={max(0, expires - int(time.time()))}"}
+    if settings.LOCAL_STORAGE_ACCEL_PREFIX:
+        headers["X-Accel-Redirect"] = f"{settings.LOCAL_STORAGE_ACCEL_PREFIX.rstrip('/')}/{quote(key)}"
+        return Response(headers=headers, media_type=meta["content_type"])
+    return SendfileResponse(path, media_type=meta["content_type"], headers=headers)
+
+
+@app.post(settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request):
+    dispatcher = getattr(app.state, "dispatcher", None)
+    if dispatcher is None:
+        return Response(status_code=404)
+
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(secret, get_webhook_secret()):
+        return Response(status_code=401)
+
+    bot = app.state.bot
+    update = Update.model_validate(await request.json(), context={"bot": bot})
+    # A full worker sheds the update instead of queueing handlers without bound; Telegram
+    # redelivers anything that was not answered with 2xx.
+    slots = app.state.webhook_slots
+    if slots.locked():
+        logger.warning("Webhook saturated with %d updates in flight", len(app.state.webhook_tasks))
+        return Response(status_code=503)
+    await slots.acquire()
+    # Answer Telegram right away; handlers run in the background so a slow S3 call
+    # never delays the next update delivery.
+    task = asyncio.create_task(dispatcher.feed_update(bot, update))
+    app.state.webhook_tasks.add(task)
+    task.add_done_callback(_on_webhook_update_done)
+    return Response(status_code=200)
+
+
 @app.get("/login")
 async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request, "error": ""})
@@ -117,15 +457,11 @@ async def login_page(request: Request):
 @app.get("/app")
 async def tgapp_home(request: Request, init_data: str = ""):
     user_id = _tg_user_id_from_init_data(init_data)
-    packs = get_packs(limit=200, offset=0)
-    for pack in packs:
-        pack["cover_url"] = _pack_cover_url(pack)
-
     return templates.TemplateResponse(
         "tgapp_home.html",
         {
             "request": request,
-            "packs": packs,
+            "catalog_html": _catalog_fragment(),
             "user_id": user_id,
             "init_data": init_data,
         },
@@ -139,7 +475,7 @@ async def tgapp_pack_page(request: Request, pack_id: int, init_data: str = ""):
     if not pack:
         return RedirectResponse(url="/app", status_code=303)
 
-    pack["cover_url"] = _pack_cover_url(pack)
+    _attach_cover_urls(pack, HERO_COVER_WIDTH)
     pack["demo_urls"] = _pack_demo_urls(pack)
 
     return templates.TemplateResponse(
@@ -170,6 +506,32 @@ async def tgapp_orders_page(request: Request, init_data: str = ""):
     )
 
 
+@app.get("/api/packs")
+async def api_packs(request: Request):
+    etag = f'"catalog-{get_catalog_version()}-{_presign_window()}"'
+    return _cached_json(request, etag, CATALOG_CACHE_CONTROL, _catalog_payload)
+
+
+@app.get("/api/packs/{pack_id}")
+async def api_pack(request: Request, pack_id: int):
+    etag = f'"pack-{pack_id}-{get_catalog_version()}-{_presign_window()}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL})
+    pack = get_pack(pack_id)
+    if not pack:
+        return JSONResponse({"ok": False, "error": "pack_not_found"}, status_code=404)
+    return _cached_json(request, etag, CATALOG_CACHE_CONTROL, lambda: _pack_payload(pack))
+
+
+@app.get("/api/orders")
+async def api_orders(request: Request, init_data: str = ""):
+    user_id = _tg_user_id_from_init_data(request.headers.get("X-Telegram-Init-Data") or init_data)
+    if not user_id:
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    etag = f'"orders-{user_id}-{get_version("purchases")}"'
+    return _cached_json(request, etag, ORDERS_CACHE_CONTROL, lambda: _orders_payload(user_id))
+
+
 @app.post("/app/order")
 async def tgapp_create_order(
     pack_id: int = Form(...),
@@ -193,16 +555,32 @@ async def tgapp_create_order(
         return JSONResponse({"ok": False, "error": "invalid_license"}, status_code=400)
 
     stars_amount = int(price_map[license_type])
-    purchase_id = add_purchase(
-        user_id=user_id,
-        pack_id=pack_id,
-        license_type=license_type,
-        stars_amount=stars_amount,
-        status="pending",
-    )
-    purchase = get_purchase_by_id(purchase_id)
-    if purchase:
-        await _notify_admins(purchase, product_name=pack.get("name", ""))
+    invoice_link = None
+    bot = getattr(app.state, "bot", None)
+    if bot is not None:
+        try:
+            invoice_link = await get_invoice_link(bot, pack, license_type)
+        except Exception:
+            logger.exception("Failed to create invoice link for pack %s", pack_id)
+
+    # Repeated taps (or a cancelled invoice) reuse the open order instead of piling up
+    # pending rows. With an invoice link, admins hear about the order once it is paid;
+    # without one it waits for manual confirmation, so they are told now.
+    pending = get_pending_purchase(user_id, pack_id, license_type, stars_amount, source="app")
+    if pending is not None:
+        purchase_id = int(pending["id"])
+    else:
+        purchase_id = add_purchase(
+            user_id=user_id,
+            pack_id=pack_id,
+            license_type=license_type,
+            stars_amount=stars_amount,
+            status="pending",
+            outbox=None if invoice_link else admin_outbox(settings.ADMIN_IDS + get_admins()),
+            source="app",
+        )
+        if not invoice_link:
+            _wake_notifier()
 
     return JSONResponse(
         {
@@ -211,6 +589,7 @@ async def tgapp_create_order(
             "status": "pending",
             "license_type": license_type,
             "stars_amount": stars_amount,
+            "invoice_link": invoice_link,
         }
     )
 
@@ -250,6 +629,74 @@ async def dashboard(request: Request):
     return templates.TemplateResponse("dashboard.html", {"request": request, "stats": stats})
 
 
+@app.get("/runtime")
+async def runtime_stats(request: Request):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    notifier = _get_notifier()
+    broadcaster = _get_broadcaster()
+    events = _get_event_bus()
+    return JSONResponse(
+        {
+            "events": events.snapshot() if events else None,
+            "notifications": notifier.snapshot() if notifier else None,
+            "broadcasts": broadcaster.snapshot() if broadcaster else None,
+            "sender": get_sender().snapshot(),
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    token = get_settings().METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not (token and hmac.compare_digest(authorization, f"Bearer {token}")):
+        redirect = auth_or_redirect(request)
+        if redirect:
+            return Response(status_code=401) if token else redirect
+
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/events")
+async def events_stream(request: Request):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    bus = _get_event_bus()
+    if bus is None:
+        return Response(status_code=503)
+
+    subscription = bus.subscribe()
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            yield format_sse({"id": bus.seq, "type": "stats", "data": get_stats()})
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=bus.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if event["type"] == "resync":
+                    event = {**event, "data": get_stats()}
+                yield format_sse(event)
+        finally:
+            bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/packs")
 async def packs_list(request: Request):
     redirect = auth_or_redirect(request)
@@ -288,7 +735,7 @@ async def packs_add_action(
     if redirect:
         return redirect
 
-    s3 = get_s3_client()
+    s3 = get_async_s3_client()
 
     pack_id = add_pack(
         name=name,
@@ -302,33 +749,16 @@ async def packs_add_action(
 
     zip_key = f"packs/{pack_id}/pack.zip"
     zip_bytes = await zip_file.read()
-    s3.upload_file(zip_bytes, zip_key, zip_file.content_type or "application/zip")
+    await s3.upload_file(zip_bytes, zip_key, zip_file.content_type or "application/zip")
 
+    cover_key = None
+    cover_thumbs: list[int] = []
     if cover_file and cover_file.filename:
-        cover_key = f"packs/{pack_id}/cover.jpg"
-        cover_bytes = await cover_file.read()
-        s3.upload_file(cover_bytes, cover_key, cover_file.content_type or "image/jpeg")
-
-    demo_urls: list[str] = []
-    public_base = settings.S3_PUBLIC_BASE_URL.rstrip("/") if settings.S3_PUBLIC_BASE_URL else ""
-    if demo_files:
-        idx = 1
-        for demo in demo_files:
-            if not demo.filename:
-                continue
-            ext = "mp3"
-            if "." in demo.filename:
-                ext = demo.filename.rsplit(".", 1)[-1]
-            demo_key = f"packs/{pack_id}/demos/demo_{idx}.{ext}"
-            demo_bytes = await demo.read()
-            s3.upload_file(demo_bytes, demo_key, demo.content_type or "audio/mpeg")
-            if public_base:
-                demo_urls.append(f"{public_base}/{settings.S3_BUCKET}/{demo_key}")
-            else:
-                demo_urls.append(demo_key)
-            idx += 1
-
-    update_pack(pack_id, s3_key=zip_key, demo_urls=demo_urls)
+        cover_key, cover_thumbs = await _upload_cover(s3, pack_id, cover_file)
+
+    demo_urls = await _upload_demos(s3, pack_id, demo_files)
+
+    update_pack(pack_id, s3_key=zip_key, demo_urls=demo_urls, cover_key=cover_key, cover_thumbs=cover_thumbs)
     return RedirectResponse(url="/packs", status_code=303)
 
 
@@ -369,7 +799,7 @@ async def packs_edit_action(
     if not pack:
         return RedirectResponse(url="/packs", status_code=303)
 
-    s3 = get_s3_client()
+    s3 = get_async_s3_client()
     updates: dict[str, Any] = {
         "name": name,
         "description": description,
@@ -378,46 +808,30 @@ async def packs_edit_action(
         "price_collector": int(price_collector),
     }
 
+    stale_keys: list[str] = []
     if zip_file and zip_file.filename:
-        if pack.get("s3_key"):
-            try:
-                s3.delete_file(pack["s3_key"])
-            except Exception:
-                pass
-
         zip_key = f"packs/{pack_id}/pack.zip"
         zip_bytes = await zip_file.read()
-        s3.upload_file(zip_bytes, zip_key, zip_file.content_type or "application/zip")
+        await s3.upload_file(zip_bytes, zip_key, zip_file.content_type or "application/zip")
+        if pack.get("s3_key") and pack["s3_key"] != zip_key:
+            stale_keys.append(pack["s3_key"])
         updates["s3_key"] = zip_key
 
     if cover_file and cover_file.filename:
-        cover_key = f"packs/{pack_id}/cover.jpg"
-        cover_bytes = await cover_file.read()
-        s3.upload_file(cover_bytes, cover_key, cover_file.content_type or "image/jpeg")
+        cover_key, cover_thumbs = await _upload_cover(s3, pack_id, cover_file, pack)
+        if cover_key != _pack_cover_key(pack):
+            stale_keys.extend(_pack_cover_keys(pack))
+        updates["cover_key"] = cover_key
+        updates["cover_thumbs"] = cover_thumbs
 
     has_new_demo = bool(demo_files and any(df.filename for df in demo_files))
     if has_new_demo:
-        new_demo_urls: list[str] = []
-        public_base = settings.S3_PUBLIC_BASE_URL.rstrip("/") if settings.S3_PUBLIC_BASE_URL else ""
-        idx = 1
-        for demo in demo_files or []:
-            if not demo.filename:
-                continue
-            ext = "mp3"
-            if "." in demo.filename:
-                ext = demo.filename.rsplit(".", 1)[-1]
-            demo_key = f"packs/{pack_id}/demos/demo_{idx}.{ext}"
-            demo_bytes = await demo.read()
-            s3.upload_file(demo_bytes, demo_key, demo.content_type or "audio/mpeg")
-            if public_base:
-                new_demo_urls.append(f"{public_base}/{settings.S3_BUCKET}/{demo_key}")
-            else:
-                new_demo_urls.append(demo_key)
-            idx += 1
-
+        new_demo_urls = await _upload_demos(s3, pack_id, demo_files)
+        stale_keys.extend(key for key in pack.get("demo_urls", []) if key not in new_demo_urls)
         updates["demo_urls"] = new_demo_urls
 
     update_pack(pack_id, **updates)
+    await _delete_keys(s3, stale_keys)
     return RedirectResponse(url="/packs", status_code=303)
 
 
@@ -429,26 +843,8 @@ async def packs_delete_action(request: Request, pack_id: int):
 
     pack = get_pack(pack_id)
     if pack:
-        s3 = get_s3_client()
-        for key in [pack.get("s3_key")]:
-            if not key:
-                continue
-            try:
-                s3.delete_file(key)
-            except Exception:
-                pass
-
-        try:
-            s3.delete_file(f"packs/{pack_id}/cover.jpg")
-        except Exception:
-            pass
-
-        for demo in pack.get("demo_urls", []):
-            if isinstance(demo, str) and not demo.startswith("http://") and not demo.startswith("https://"):
-                try:
-                    s3.delete_file(demo)
-                except Exception:
-                    pass
+        s3 = get_async_s3_client()
+        await _delete_keys(s3, [pack.get("s3_key") or "", *_pack_cover_keys(pack), *pack.get("demo_urls", [])])
 
         delete_pack(pack_id)
 
@@ -468,6 +864,59 @@ async def orders_page(request: Request, status: str = ""):
     )
 
 
+def _export_filters(date_from: str, date_to: str) -> tuple[str | None, str | None]:
+    created_from = date.fromisoformat(date_from).isoformat() if date_from else None
+    created_to = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat() if date_to else None
+    return created_from, created_to
+
+
+def _iter_export_csv(purchases: Iterator[dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for index, purchase in enumerate(purchases, start=1):
+        writer.writerow([purchase.get(field) for field in EXPORT_FIELDS])
+        if index % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _iter_export_ndjson(purchases: Iterator[dict[str, Any]]) -> Iterator[str]:
+    lines: list[str] = []
+    for purchase in purchases:
+        lines.append(json.dumps({field: purchase.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False))
+        if len(lines) == EXPORT_FLUSH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@app.get("/orders/export.{fmt}")
+async def orders_export(request: Request, fmt: str, status: str = "", date_from: str = "", date_to: str = ""):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    if fmt not in ("csv", "ndjson"):
+        return Response(status_code=404)
+    try:
+        created_from, created_to = _export_filters(date_from, date_to)
+    except ValueError:
+        return JSONResponse({"ok": False, "error": "invalid_date"}, status_code=400)
+
+    purchases = iter_purchases(status=status or None, created_from=created_from, created_to=created_to)
+    headers = {"Content-Disposition": f'attachment; filename="purchases.{fmt}"', "Cache-Control": "no-store"}
+    if fmt == "csv":
+        return StreamingResponse(_iter_export_csv(purchases), media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(_iter_export_ndjson(purchases), media_type="application/x-ndjson", headers=headers)
+
+
 @app.post("/orders/{order_id}/confirm")
 async def confirm_order(request: Request, order_id: int):
     redirect = auth_or_redirect(request)
@@ -491,7 +940,49 @@ async def confirm_order(request: Request, order_id: int):
     except Exception:
         return RedirectResponse(url="/orders", status_code=303)
 
-    update_purchase_status(order_id, "completed")
-    await _send_download_link(int(purchase["user_id"]), url)
+    update_purchase_status(
+        order_id,
+        "completed",
+        outbox=download_link_outbox(int(purchase["user_id"]), f"Payment confirmed. Download link (24 hours):\n{url}"),
+    )
+    _wake_notifier()
 
     return RedirectResponse(url="/orders", status_code=303)
+
+
+@app.get("/broadcasts")
+async def broadcasts_page(request: Request):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    broadcasts = get_broadcasts(limit=100, offset=0)
+    return templates.TemplateResponse(
+        "broadcasts.html",
+        {"request": request, "broadcasts": broadcasts, "enabled": _get_broadcaster() is not None},
+    )
+
+
+@app.post("/broadcasts")
+async def broadcasts_create_action(request: Request, text: str = Form(...)):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    if text.strip():
+        create_broadcast(text.strip())
+        broadcaster = _get_broadcaster()
+        if broadcaster is not None:
+            broadcaster.wake()
+
+    return RedirectResponse(url="/broadcasts", status_code=303)
+
+
+@app.post("/broadcasts/{broadcast_id}/cancel")
+async def broadcasts_cancel_action(request: Request, broadcast_id: int):
+    redirect = auth_or_redirect(request)
+    if redirect:
+        return redirect
+
+    finish_broadcast(broadcast_id, status="cancelled")
+    return RedirectResponse(url="/broadcasts", status_code=303)
@@ -40,15 +40,171 @@
     return null;
   };
 
+  function escapeHtml(value) {
+    const entities = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+    return String(value == null ? '' : value).replace(/[&<>"']/g, (c) => entities[c]);
+  }
+
+  // Render from the last response kept in localStorage, then revalidate it with
+  // If-None-Match: an unchanged catalog costs one empty 304.
+  function cachedJson(url, storageKey, headers, render) {
+    let cached = null;
+    try {
+      cached = JSON.parse(window.localStorage.getItem(storageKey) || 'null');
+    } catch (e) {
+      cached = null;
+    }
+    if (cached && cached.data) {
+      render(cached.data);
+    }
+
+    const requestHeaders = Object.assign({}, headers || {});
+    if (cached && cached.etag) {
+      requestHeaders['If-None-Match'] = cached.etag;
+    }
+    return fetch(url, { headers: requestHeaders, cache: 'no-cache' })
+      .then((response) => {
+        const etag = response.headers.get('ETag');
+        if (response.status === 304 || !response.ok || (cached && etag && etag === cached.etag)) {
+          return;
+        }
+        return response.json().then((data) => {
+          try {
+            window.localStorage.setItem(storageKey, JSON.stringify({ etag: etag, data: data }));
+          } catch (e) {
+            // Storage full or disabled: keep the server-rendered page.
+          }
+          render(data);
+        });
+      })
+      .catch(() => {});
+  }
+
+  function coverHtml(p) {
+    if (!p.cover_url) {
+      return '<div class="cover cover-placeholder d-flex align-items-center justify-content-center"><span class="display-6">🎵</span></div>';
+    }
+    const sizes = '(min-width: 992px) 33vw, (min-width: 576px) 50vw, 100vw';
+    const webp = p.cover_webp_srcset
+      ? `<source type="image/webp" srcset="${escapeHtml(p.cover_webp_srcset)}" sizes="${sizes}" />`
+      : '';
+    const srcset = p.cover_srcset ? ` srcset="${escapeHtml(p.cover_srcset)}" sizes="${sizes}"` : '';
+    return `<picture>${webp}<img src="${escapeHtml(p.cover_url)}"${srcset} class="card-img-top cover" alt="${escapeHtml(p.name)}" loading="lazy" decoding="async" /></picture>`;
+  }
+
+  function packCardHtml(p) {
+    const description = p.description.length > 120 ? p.description.slice(0, 120) + '...' : p.description;
+    return `
+      <div class="col-12 col-sm-6 col-lg-4 pack-card-item" data-search="${escapeHtml(p.name.toLowerCase())}">
+        <article class="card pack-card h-100 border-0 shadow-sm">
+          ${coverHtml(p)}
+          <div class="card-body d-flex flex-column">
+            <div class="d-flex justify-content-between align-items-start mb-2">
+              <h2 class="h5 mb-0">${escapeHtml(p.name)}</h2>
+            </div>
+            <p class="small text-secondary flex-grow-1 mb-2">${escapeHtml(description)}</p>
+            <div class="d-flex justify-content-between align-items-center mb-3">
+              <div class="small">
+                <div><strong>Starter:</strong> ${escapeHtml(p.price_starter)}⭐</div>
+                <div><strong>Producer:</strong> ${escapeHtml(p.price_producer)}⭐</div>
+                <div><strong>Collector:</strong> ${escapeHtml(p.price_collector)}⭐</div>
+              </div>
+            </div>
+            <a href="/app/pack/${encodeURIComponent(p.id)}" class="btn btn-gradient w-100">Open pack</a>
+          </div>
+        </article>
+      </div>`;
+  }
+
+  function orderHtml(o) {
+    const badge = o.status === 'completed' ? 'text-bg-success' : o.status === 'pending' ? 'text-bg-warning' : 'text-bg-secondary';
+    return `
+      <article class="card border-0 shadow-sm">
+        <div class="card-body">
+          <div class="d-flex justify-content-between align-items-start gap-2">
+            <div>
+              <div class="fw-semibold">Purchase #${escapeHtml(o.id)}</div>
+              <div class="small text-secondary">Pack: ${escapeHtml(o.pack_name || o.pack_id)}</div>
+            </div>
+            <span class="badge ${badge}">${escapeHtml(o.status)}</span>
+          </div>
+          <hr class="my-2" />
+          <div class="small">
+            <div>License: <span class="fw-semibold">${escapeHtml(o.license_type)}</span></div>
+            <div>Stars: <span class="fw-semibold">${escapeHtml(o.stars_amount)}</span></div>
+            <div>Charge ID: <span class="text-secondary">${escapeHtml(o.telegram_payment_charge_id || '-')}</span></div>
+            <div class="text-secondary">${escapeHtml(o.created_at)}</div>
+          </div>
+        </div>
+      </article>`;
+  }
+
   const search = document.getElementById('packSearch');
-  const cards = document.querySelectorAll('.pack-card-item');
-  if (search && cards.length) {
-    search.addEventListener('input', function () {
-      const q = search.value.trim().toLowerCase();
-      cards.forEach((el) => {
-        const s = String(el.dataset.search || '');
-        el.classList.toggle('d-none', q && !s.includes(q));
+
+  function applySearch() {
+    if (!search) {
+      return;
+    }
+    const q = search.value.trim().toLowerCase();
+    document.querySelectorAll('.pack-card-item').forEach((el) => {
+      const s = String(el.dataset.search || '');
+      el.classList.toggle('d-none', q && !s.includes(q));
+    });
+  }
+
+  if (search) {
+    search.addEventListener('input', applySearch);
+  }
+
+  const packsGrid = document.getElementById('packsGrid');
+  if (packsGrid && packsGrid.dataset.api) {
+    cachedJson(packsGrid.dataset.api, 'tgapp:packs', null, (data) => {
+      packsGrid.innerHTML = data.packs.map(packCardHtml).join('');
+      applySearch();
+    });
+  }
+
+  // Inside Telegram the invoice opens over the Mini App; the link is shared per pack and
+  // price, so the server usually answers from its cache without calling the Bot API.
+  const buyButtons = document.querySelectorAll('[data-buy-license]');
+  const packMeta = document.getElementById('tgappMeta');
+  const buyPackId = packMeta ? packMeta.dataset.packId : '';
+  if (tg && tg.openInvoice && initData && buyPackId) {
+    buyButtons.forEach((button) => {
+      button.classList.remove('d-none');
+      button.addEventListener('click', () => {
+        const form = new FormData();
+        form.append('pack_id', buyPackId);
+        form.append('license_type', button.dataset.buyLicense);
+        form.append('init_data', initData);
+        button.disabled = true;
+        fetch('/app/order', { method: 'POST', body: form })
+          .then((response) => response.json())
+          .then((data) => {
+            if (!data.ok || !data.invoice_link) {
+              throw new Error(data.error || 'invoice_unavailable');
+            }
+            tg.openInvoice(data.invoice_link, (status) => {
+              if (status === 'paid') {
+                window.location.href = '/app/orders';
+              }
+            });
+          })
+          .catch(() => tg.showAlert('Payment is temporarily unavailable. Please use the bot chat.'))
+          .finally(() => {
+            button.disabled = false;
+          });
       });
     });
   }
+
+  const ordersList = document.getElementById('ordersList');
+  const userId = window.tgAppUserId();
+  if (ordersList && ordersList.dataset.api && initData && userId) {
+    cachedJson(ordersList.dataset.api, 'tgapp:orders:' + userId, { 'X-Telegram-Init-Data': initData }, (data) => {
+      ordersList.innerHTML = data.orders.length
+        ? data.orders.map(orderHtml).join('')
+        : '<div class="card border-0 shadow-sm"><div class="card-body text-secondary">No purchases yet.</div></div>';
+    });
+  }
 })();
@@ -2,25 +2,57 @@ import hashlib
 import hmac
 import json
 import time
+from functools import lru_cache
 from urllib.parse import parse_qsl
 
+from app.cache import TTLCache
+from app.metrics import register_cache
+
+INIT_DATA_CACHE_SIZE = 10000
+INIT_DATA_CACHE_TTL = 300.0
+
+_validated_init_data = TTLCache(INIT_DATA_CACHE_SIZE, INIT_DATA_CACHE_TTL)
+register_cache("init_data", _validated_init_data)
+
+
+@lru_cache(maxsize=8)
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+
 
 def parse_and_validate_init_data(
     init_data: str,
     bot_token: str,
     max_age_seconds: int = 60 * 60 * 24,
+    now: float | None = None,
 ) -> dict | None:
     if not init_data or not bot_token:
         return None
 
+    now = time.time() if now is None else now
+    cache_key = (bot_token, max_age_seconds, init_data)
+    cached = _validated_init_data.get(cache_key)
+    if cached is not None:
+        # Never serve a cached payload past the point where auth_date makes it invalid.
+        if int(now) - cached["auth_date"] <= max_age_seconds:
+            return cached
+        _validated_init_data.pop(cache_key)
+        return None
+
+    payload = _validate_init_data(init_data, bot_token, max_age_seconds, now)
+    if payload is not None:
+        _validated_init_data.set(cache_key, payload, ttl=payload["auth_date"] + max_age_seconds - now)
+    return payload
+
+
+def _validate_init_data(init_data: str, bot_token: str, max_age_seconds: int, now: float) -> dict | None:
     pairs = dict(parse_qsl(init_data, keep_blank_values=True))
     received_hash = pairs.pop("hash", "")
     if not received_hash:
         return None
 
     data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(pairs.items()))
-    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
-    calculated_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    calculated_hash = hmac.new(_secret_key(bot_token), data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
 
     if not hmac.compare_digest(calculated_hash, received_hash):
         return None
@@ -30,7 +62,7 @@ def parse_and_validate_init_data(
         return None
 
     auth_date = int(auth_date_raw)
-    if int(time.time()) - auth_date > max_age_seconds:
+    if int(now) - auth_date > max_age_seconds:
         return None
 
     user_raw = pairs.get("user", "")
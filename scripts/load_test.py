@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(client: httpx.AsyncClient, url: str, deadline: float, latencies: list[float], errors: list[int]) -> None:
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            response = await client.get(url)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError:
+            errors.append(0)
+            continue
+        latencies.append(time.monotonic() - started)
+
+
+async def run(url: str, concurrency: int, duration: float) -> dict[str, float]:
+    latencies: list[float] = []
+    errors: list[int] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        await client.get(url)
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(_worker(client, url, deadline, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure read throughput of a running web app")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/app")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration))
+    print(
+        f"{result['requests']} requests, {result['errors']} errors, {result['rps']:.1f} req/s, "
+        f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
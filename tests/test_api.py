@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.database import add_pack, add_purchase, update_pack
+from app.s3_client import get_s3_client
+from app.web import main as web_main
+from app.web.main import app
+
+
+def test_catalog_api_conditional_get(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    web_main._api_bodies.clear()
+    web_main._catalog_fragments.clear()
+
+    with TestClient(app) as client:
+        pack_id = add_pack("Pack", "Desc", 1, 2, 3, "packs/1/pack.zip")
+
+        response = client.get("/api/packs")
+        assert response.status_code == 200
+        assert response.headers["cache-control"].startswith("public")
+        etag = response.headers["etag"]
+        assert [p["name"] for p in response.json()["packs"]] == ["Pack"]
+
+        cached = client.get("/api/packs", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        detail = client.get(f"/api/packs/{pack_id}")
+        assert detail.status_code == 200
+        assert detail.json()["demo_urls"] == []
+        assert client.get(f"/api/packs/{pack_id}", headers={"If-None-Match": detail.headers["etag"]}).status_code == 304
+        assert client.get("/api/packs/999").status_code == 404
+
+        update_pack(pack_id, name="Renamed")
+        fresh = client.get("/api/packs", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+        assert fresh.json()["packs"][0]["name"] == "Renamed"
+
+        assert client.get("/api/orders").status_code == 401
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_catalog_fragment_is_cached_per_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    web_main._api_bodies.clear()
+    web_main._catalog_fragments.clear()
+
+    with TestClient(app) as client:
+        pack_id = add_pack("Pack <One>", "Desc", 1, 2, 3, "packs/1/pack.zip")
+        assert "Pack &lt;One&gt;" in client.get("/app").text
+
+        calls = []
+        original = web_main.get_packs
+        monkeypatch.setattr(web_main, "get_packs", lambda **kwargs: calls.append(kwargs) or original(**kwargs))
+        assert "Pack &lt;One&gt;" in client.get("/app").text
+        assert calls == []
+
+        update_pack(pack_id, name="Renamed")
+        assert "Renamed" in client.get("/app").text
+        assert len(calls) == 1
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_orders_export_streams_filtered_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("WEB_PASSWORD", "secret")
+    get_settings.cache_clear()
+
+    with TestClient(app) as client:
+        assert client.get("/orders/export.csv", follow_redirects=False).status_code == 303
+        client.post("/login", data={"password": "secret"})
+
+        pack_id = add_pack("Pack, One", "", 1, 2, 3, "packs/1/pack.zip")
+        for user_id in range(1, 1203):
+            add_purchase(user_id, pack_id, "starter", 1, status="completed" if user_id % 2 else "pending")
+
+        response = client.get("/orders/export.csv", params={"status": "completed"})
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 601
+        assert rows[0]["pack_name"] == "Pack, One"
+        assert {row["status"] for row in rows} == {"completed"}
+
+        today = datetime.utcnow().date()
+        response = client.get("/orders/export.ndjson", params={"date_from": today.isoformat(), "date_to": today.isoformat()})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == list(range(1, 1203))
+
+        yesterday = (today - timedelta(days=1)).isoformat()
+        assert client.get("/orders/export.ndjson", params={"date_to": yesterday}).text == ""
+        assert client.get("/orders/export.csv", params={"date_from": "nope"}).status_code == 400
+
+    get_settings.cache_clear()
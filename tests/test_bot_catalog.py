@@ -0,0 +1,85 @@
+from app.bot import catalog
+from app.config import get_settings
+from app.database import add_pack, init_db, update_pack
+from app.s3_client import get_s3_client
+
+
+def _buttons(markup):
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def test_shop_pages_use_keyset_cursors_and_cache_per_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("BOT_SHOP_PAGE_SIZE", "3")
+    get_settings.cache_clear()
+    catalog._shop_pages.clear()
+    catalog._pack_views.clear()
+    catalog._catalog_version.clear()
+    init_db()
+    pack_ids = [add_pack(f"Pack {i}", "", 1, 2, 3, f"packs/{i}/pack.zip") for i in range(1, 8)]
+
+    first = catalog.shop_page()
+    assert _buttons(first) == ["pack:7", "pack:6", "pack:5", "shop:next:5"]
+    second = catalog.shop_page("next", 5)
+    assert _buttons(second) == ["pack:4", "pack:3", "pack:2", "shop:prev:4", "shop:next:2"]
+    assert _buttons(catalog.shop_page("next", 2)) == ["pack:1", "shop:prev:1"]
+    assert _buttons(catalog.shop_page("prev", 1)) == _buttons(second)
+    assert _buttons(catalog.shop_page("prev", 4)) == _buttons(first)
+    assert catalog.shop_page("next", 1) is None
+
+    calls = []
+    get_packs_before, get_pack = catalog.get_packs_before, catalog.get_pack
+    get_catalog_version = catalog.get_catalog_version
+    monkeypatch.setattr(catalog, "get_packs_before", lambda *args: calls.append(args) or [])
+    monkeypatch.setattr(catalog, "get_pack", lambda pack_id: calls.append(pack_id) or None)
+    monkeypatch.setattr(catalog, "get_catalog_version", lambda: calls.append("version") or 0)
+    assert catalog.shop_page() is first
+    assert calls == []
+
+    monkeypatch.setattr(catalog, "get_packs_before", get_packs_before)
+    monkeypatch.setattr(catalog, "get_pack", get_pack)
+    monkeypatch.setattr(catalog, "get_catalog_version", get_catalog_version)
+    text, markup = catalog.pack_view(pack_ids[0])
+    assert text.startswith("<b>Pack 1</b>")
+    assert catalog.pack_view(pack_ids[0])[1] is markup
+
+    update_pack(pack_ids[0], name="Renamed")
+    # Stands in for CATALOG_VERSION_CHECK_SECONDS passing.
+    catalog._catalog_version.clear()
+    assert catalog.pack_view(pack_ids[0])[0].startswith("<b>Renamed</b>")
+    assert catalog.shop_page() is not first
+
+    get_settings.cache_clear()
+
+
+def test_inline_search_uses_fts_and_caches_by_normalized_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    catalog._search_results.clear()
+    init_db()
+    lofi = add_pack("Lo-Fi Drums", "Dusty café loops", 10, 20, 30, "packs/1/pack.zip", cover_key="covers/a.jpg")
+    add_pack("Trap Vocals", "", 1, 2, 3, "packs/2/pack.zip")
+
+    results = catalog.search_results("  DUSTY  Cafe!", "shopbot")
+    assert [result.title for result in results] == ["Lo-Fi Drums"]
+    assert results[0].description == "Dusty café loops · from 10⭐"
+    assert "/files/covers/a.jpg" in results[0].thumbnail_url
+    assert [row[0].url for row in results[0].reply_markup.inline_keyboard] == [
+        f"https://t.me/shopbot?start=buy_{lofi}_starter",
+        f"https://t.me/shopbot?start=buy_{lofi}_producer",
+        f"https://t.me/shopbot?start=buy_{lofi}_collector",
+    ]
+    assert [result.title for result in catalog.search_results("", "shopbot")] == ["Trap Vocals", "Lo-Fi Drums"]
+
+    calls = []
+    monkeypatch.setattr(catalog, "search_packs", lambda *args, **kwargs: calls.append(args) or [])
+    assert catalog.search_results("dusty cafe", "shopbot") is results
+    assert calls == []
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
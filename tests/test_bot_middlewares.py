@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Update
+
+from app.bot.middlewares import setup_middlewares
+from app.config import get_settings
+
+
+def _callback_update(update_id: int, user_id: int, data: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": "1",
+                "from": {"id": user_id, "is_bot": False, "first_name": "A"},
+                "data": data,
+            },
+        }
+    )
+
+
+def test_expensive_callbacks_are_throttled_per_user(monkeypatch, caplog):
+    monkeypatch.setenv("BOT_CALLBACK_RATE", "0.01")
+    monkeypatch.setenv("BOT_CALLBACK_BURST", "2")
+    monkeypatch.setenv("BOT_THROTTLE_USERS_MAX", "2")
+    monkeypatch.setenv("BOT_SLOW_UPDATE_SECONDS", "0")
+    get_settings.cache_clear()
+
+    handled = []
+    answers = []
+    router = Router(name="probe")
+
+    @router.callback_query(F.data.startswith(("demo:", "pack:")))
+    async def probe(callback: CallbackQuery) -> None:
+        handled.append((callback.from_user.id, callback.data))
+
+    async def fake_answer(self, text=None, **kwargs):
+        answers.append((self.from_user.id, text))
+
+    monkeypatch.setattr(CallbackQuery, "answer", fake_answer)
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    setup_middlewares(dispatcher)
+    bot = Bot(token="42:TEST")
+
+    async def scenario():
+        presses = [(1, "demo:1"), (1, "demo:1"), (1, "demo:1"), (1, "pack:1"), (2, "demo:1"), (3, "demo:1")]
+        for update_id, (user_id, data) in enumerate(presses, start=1):
+            await dispatcher.feed_update(bot, _callback_update(update_id, user_id, data))
+        await bot.session.close()
+
+    with caplog.at_level(logging.WARNING, logger="app.bot.middlewares"):
+        asyncio.run(scenario())
+
+    assert handled == [(1, "demo:1"), (1, "demo:1"), (1, "pack:1"), (2, "demo:1"), (3, "demo:1")]
+    assert answers == [(1, "Too many requests, please wait a moment.")]
+    assert "handled by probe.probe" in caplog.text
+
+    throttle = dispatcher.callback_query.outer_middleware._middlewares[0]
+    assert list(throttle.buckets) == [2, 3]
+
+    get_settings.cache_clear()
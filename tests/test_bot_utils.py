@@ -0,0 +1,30 @@
+import asyncio
+
+from app.bot import utils
+
+
+def test_demo_media_is_fetched_concurrently(monkeypatch):
+    class FakeAsyncS3:
+        active = peak = 0
+
+        def public_url(self, key):
+            return None
+
+        async def download_file(self, key):
+            FakeAsyncS3.active += 1
+            FakeAsyncS3.peak = max(FakeAsyncS3.peak, FakeAsyncS3.active)
+            await asyncio.sleep(0.05)
+            FakeAsyncS3.active -= 1
+            if key == "demos/broken.mp3":
+                raise RuntimeError("boom")
+            return key.encode()
+
+    monkeypatch.setattr(utils, "get_async_s3_client", FakeAsyncS3)
+    demos = ["https://cdn.example/a.mp3", *[f"demos/{i}.mp3" for i in range(4)], "demos/broken.mp3"]
+
+    media, failed = asyncio.run(utils.fetch_demo_media(demos, concurrency=3))
+
+    assert FakeAsyncS3.peak == 3
+    assert failed == [6]
+    assert media[0].media == "https://cdn.example/a.mp3"
+    assert [item.media.filename for item in media[1:]] == [f"demo_{i}.mp3" for i in range(2, 6)]
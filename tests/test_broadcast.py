@@ -0,0 +1,76 @@
+import asyncio
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from app.broadcast import BroadcastRunner
+from app.config import get_settings
+from app.database import (
+    add_pack,
+    add_purchase,
+    checkpoint_broadcast,
+    claim_broadcast,
+    claim_outbox,
+    create_broadcast,
+    get_broadcast,
+    get_buyer_ids_after,
+    init_db,
+)
+from app.telegram_sender import get_sender
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if chat_id == 7:
+            method = SendMessage(chat_id=chat_id, text=text)
+            raise TelegramForbiddenError(method=method, message="bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+def test_broadcast_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BROADCAST_PAGE_SIZE", "4")
+    monkeypatch.setenv("BROADCAST_CONCURRENCY", "3")
+    monkeypatch.setenv("TG_GLOBAL_RATE", "1000")
+    monkeypatch.setenv("TG_GLOBAL_BURST", "1000")
+    get_settings.cache_clear()
+    get_sender.cache_clear()
+    init_db()
+
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+    for user_id in range(1, 13):
+        add_purchase(user_id, pack_id, "starter", 1, status="completed")
+    add_purchase(5, pack_id, "producer", 2, status="completed")
+    add_purchase(100, pack_id, "starter", 1)
+    assert get_buyer_ids_after(0, 100) == list(range(1, 13))
+
+    broadcast_id = create_broadcast("New pack out now", created_by=42)
+    crashed = claim_broadcast("crashed-worker")
+    assert crashed["id"] == broadcast_id
+    assert claim_broadcast("other-worker") is None
+    checkpoint_broadcast(broadcast_id, "crashed-worker", 3, 3, 0, 0, lease_seconds=0)
+
+    async def scenario():
+        bot = FakeBot()
+        runner = BroadcastRunner(bot)
+        broadcast = claim_broadcast(runner.worker_id)
+        await runner.run_broadcast(broadcast)
+        return bot
+
+    bot = asyncio.run(scenario())
+
+    assert sorted(bot.sent) == [4, 5, 6, 8, 9, 10, 11, 12]
+    broadcast = get_broadcast(broadcast_id)
+    assert broadcast["status"] == "completed"
+    assert broadcast["cursor_user_id"] == 12
+    assert (broadcast["delivered"], broadcast["blocked"], broadcast["failed"]) == (11, 1, 0)
+
+    report = claim_outbox("test", limit=10)
+    assert [item["chat_id"] for item in report] == [42]
+    assert "Delivered: 11" in report[0]["payload"]["text"]
+
+    get_settings.cache_clear()
+    get_sender.cache_clear()
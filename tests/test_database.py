@@ -1,13 +1,23 @@
+import sqlite3
+import threading
+import time
+
 from app.config import get_settings
 from app.database import (
     add_pack,
     add_purchase,
+    claim_outbox,
+    complete_outbox,
+    count_pending_outbox,
+    delete_pack,
+    get_catalog_version,
     get_pack,
     get_packs,
     get_purchase,
     get_purchase_by_id,
     get_stats,
     init_db,
+    release_outbox,
     update_purchase_status,
     update_pack,
 )
@@ -63,3 +73,60 @@ def test_database_crud(tmp_path, monkeypatch):
     assert stats["packs_count"] == 1
     assert stats["purchases_count"] == 1
     assert stats["revenue_stars"] == 300
+
+
+def test_outbox_written_with_status_change(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+
+    init_db()
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+    purchase_id = add_purchase(12345, pack_id, "starter", 1)
+    message = {"kind": "download_link", "chat_id": 12345, "payload": {"text": "link"}}
+
+    update_purchase_status(purchase_id, "completed", telegram_payment_charge_id="chg", outbox=[message])
+    update_purchase_status(purchase_id, "completed", telegram_payment_charge_id="chg", outbox=[message])
+    assert count_pending_outbox() == 1
+
+    init_db()
+    assert get_purchase("chg")["status"] == "completed"
+
+    claimed = claim_outbox("worker-a", limit=10, lease_seconds=60)
+    assert [item["payload"] for item in claimed] == [{"text": "link", "purchase_id": purchase_id}]
+    assert claim_outbox("worker-b", limit=10, lease_seconds=60) == []
+
+    assert not complete_outbox(claimed[0]["id"], "worker-b")
+    assert release_outbox(claimed[0]["id"], "worker-a")
+    reclaimed = claim_outbox("worker-b", limit=10, lease_seconds=60)
+    assert reclaimed[0]["attempts"] == 2
+    assert complete_outbox(reclaimed[0]["id"], "worker-b")
+    assert count_pending_outbox() == 0
+
+
+def test_writes_wait_for_other_processes(tmp_path, monkeypatch):
+    db_path = tmp_path / "test.db"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "0.05")
+    get_settings.cache_clear()
+
+    init_db()
+    version = get_catalog_version()
+
+    other = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    releaser = threading.Timer(0.3, other.execute, args=("COMMIT",))
+    releaser.start()
+    started = time.monotonic()
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+    assert time.monotonic() - started >= 0.25
+    releaser.join()
+    other.close()
+
+    assert get_catalog_version() == version + 1
+    update_pack(pack_id, name="Renamed")
+    delete_pack(pack_id)
+    assert get_catalog_version() == version + 3
+
+    get_settings.cache_clear()
@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+
+from app import events
+from app.config import get_settings
+from app.database import add_pack, add_purchase, init_db, update_purchase_status
+from app.events import EventBus, Subscription, format_sse
+
+
+def test_event_bus_publishes_local_and_foreign_purchases(tmp_path, monkeypatch):
+    db_path = tmp_path / "test.db"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("EVENTS_POLL_INTERVAL", "0.05")
+    get_settings.cache_clear()
+    init_db()
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+
+    async def next_event(subscription, event_type):
+        while True:
+            event = await asyncio.wait_for(subscription.get(), timeout=2)
+            if event["type"] == event_type:
+                return event
+
+    async def scenario():
+        bus = EventBus()
+        bus.start()
+        subscription = bus.subscribe()
+
+        purchase_id = add_purchase(7, pack_id, "starter", 1)
+        created = await next_event(subscription, "purchase_created")
+        assert created["data"]["id"] == purchase_id
+        assert created["data"]["pack_name"] == "Pack"
+        assert (await next_event(subscription, "stats"))["data"]["purchases_count"] == 1
+
+        update_purchase_status(purchase_id, "completed")
+        assert (await next_event(subscription, "purchase_completed"))["data"]["status"] == "completed"
+        assert (await next_event(subscription, "stats"))["data"]["revenue_stars"] == 1
+
+        with sqlite3.connect(db_path) as other:
+            other.execute(
+                "INSERT INTO purchases(user_id, pack_id, license_type, stars_amount, created_at) "
+                "VALUES (8, ?, 'producer', 2, '2030-01-01T00:00:00')",
+                (pack_id,),
+            )
+        foreign = await next_event(subscription, "purchase_created")
+        assert foreign["data"]["user_id"] == 8
+
+        await bus.stop()
+        return bus.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["subscribers"] == 1
+    assert snapshot["dropped"] == 0
+
+    get_settings.cache_clear()
+
+
+def test_idle_event_bus_does_no_database_work(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("EVENTS_POLL_INTERVAL", "0.01")
+    get_settings.cache_clear()
+    init_db()
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+    calls = []
+    monkeypatch.setattr(events, "get_purchase_by_id", lambda *args: calls.append(args))
+    monkeypatch.setattr(events, "get_version", lambda *args: calls.append(args))
+
+    async def scenario():
+        bus = EventBus()
+        bus.start()
+        add_purchase(7, pack_id, "starter", 1)
+        await asyncio.sleep(0.1)
+        await bus.stop()
+
+    asyncio.run(scenario())
+    assert calls == []
+
+    get_settings.cache_clear()
+
+
+def test_slow_subscriber_is_told_to_resync():
+    subscription = Subscription(maxsize=2)
+    for seq in range(1, 4):
+        subscription.push({"id": seq, "type": "stats", "data": {}})
+
+    assert subscription.dropped == 2
+    assert subscription.queue.get_nowait() == {"id": 3, "type": "resync", "data": {}}
+    assert format_sse({"id": 3, "type": "stats", "data": {"a": 1}}) == 'id: 3\nevent: stats\ndata: {"a":1}\n\n'
@@ -0,0 +1,24 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app.images import render_thumbnails, thumbnail_key
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 90)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_render_thumbnails_skips_upscaling():
+    thumbs = render_thumbnails(_png(400, 200), [160, 320, 640])
+
+    assert sorted(thumbs) == [(160, "jpg"), (160, "webp"), (320, "jpg"), (320, "webp")]
+    with Image.open(BytesIO(thumbs[(160, "webp")])) as image:
+        assert image.format == "WEBP"
+        assert image.size == (160, 80)
+
+
+def test_thumbnail_key_sits_next_to_cover():
+    assert thumbnail_key("packs/1/cover/abc.jpg", 320, "webp") == "packs/1/cover/abc_320.webp"
@@ -0,0 +1,154 @@
+import asyncio
+
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+
+from app.bot import invoices
+from app.bot.handlers.user import handle_successful_payment
+from app.config import get_settings
+from app.database import (
+    add_pack,
+    add_purchase,
+    count_pending_outbox,
+    get_pack,
+    get_purchase_by_id,
+    get_user_purchases,
+    init_db,
+    update_pack,
+)
+from app.s3_client import get_s3_client
+from app.web import main as web_main
+
+
+class FakeBot:
+    def __init__(self):
+        self.payloads = []
+
+    async def create_invoice_link(self, **kwargs):
+        self.payloads.append(kwargs["payload"])
+        return f"https://t.me/$invoice{len(self.payloads)}"
+
+
+def _payment_message(user_id: int, payload: str, amount: int, charge_id: str | None = None) -> Message:
+    return Message.model_validate(
+        {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "A"},
+            "successful_payment": {
+                "currency": "XTR",
+                "total_amount": amount,
+                "invoice_payload": payload,
+                "telegram_payment_charge_id": charge_id or f"charge-{user_id}",
+                "provider_payment_charge_id": "",
+            },
+        }
+    )
+
+
+def test_invoice_links_are_shared_per_price_and_resolved_on_payment(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    invoices._invoice_links.clear()
+    init_db()
+    pack_id = add_pack("Pack", "", 5, 10, 20, "packs/1/pack.zip")
+
+    bot = FakeBot()
+    link = asyncio.run(invoices.get_invoice_link(bot, get_pack(pack_id), "producer"))
+    assert asyncio.run(invoices.get_invoice_link(bot, get_pack(pack_id), "producer")) == link
+    assert bot.payloads == [f"link_{pack_id}_producer_10"]
+    assert invoices.parse_invoice_payload(bot.payloads[0]) == ("link", pack_id, "producer", 10)
+    assert invoices.parse_invoice_payload("link_1_gold_10") is None
+
+    from_bot = add_purchase(7, pack_id, "producer", 10, status="pending")
+    ordered = add_purchase(7, pack_id, "producer", 10, status="pending", source="app")
+    asyncio.run(handle_successful_payment(_payment_message(7, bot.payloads[0], 10)))
+    purchase = get_purchase_by_id(ordered)
+    assert purchase["status"] == "completed"
+    assert purchase["telegram_payment_charge_id"] == "charge-7"
+    assert get_purchase_by_id(from_bot)["status"] == "pending"
+
+    asyncio.run(handle_successful_payment(_payment_message(8, bot.payloads[0], 10)))
+    asyncio.run(handle_successful_payment(_payment_message(8, bot.payloads[0], 10)))
+    assert [p["status"] for p in get_user_purchases(8)] == ["completed"]
+    assert count_pending_outbox() == 2
+
+    update_pack(pack_id, price_producer=12)
+    asyncio.run(invoices.get_invoice_link(bot, get_pack(pack_id), "producer"))
+    assert bot.payloads[-1] == f"link_{pack_id}_producer_12"
+    update_pack(pack_id, description="New text")
+    asyncio.run(invoices.get_invoice_link(bot, get_pack(pack_id), "producer"))
+    assert len(bot.payloads) == 3
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+async def _record(replies: list, text: str) -> None:
+    replies.append(text)
+
+
+def test_bot_invoice_is_not_completed_twice(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    init_db()
+    pack_id = add_pack("Pack", "", 5, 10, 20, "packs/1/pack.zip")
+    purchase_id = add_purchase(7, pack_id, "starter", 5, status="pending")
+    payload = invoices.invoice_payload(pack_id, "starter", purchase_id)
+    replies = []
+    monkeypatch.setattr(Message, "answer", lambda self, text, **kwargs: _record(replies, text))
+
+    asyncio.run(handle_successful_payment(_payment_message(7, payload, 5, charge_id="first")))
+    asyncio.run(handle_successful_payment(_payment_message(7, payload, 5, charge_id="first")))
+    assert replies == []
+    # A second charge for the same invoice must not take over the completed purchase.
+    asyncio.run(handle_successful_payment(_payment_message(7, payload, 5, charge_id="second")))
+
+    assert get_purchase_by_id(purchase_id)["telegram_payment_charge_id"] == "first"
+    assert count_pending_outbox() == 1
+    assert replies == ["This order was already processed. Please contact support."]
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_app_orders_are_reused_and_admins_notified_on_payment(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[99]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    invoices._invoice_links.clear()
+    monkeypatch.setattr(web_main, "settings", get_settings())
+    monkeypatch.setattr(web_main, "_tg_user_id_from_init_data", lambda init_data: 7)
+
+    with TestClient(web_main.app) as client:
+        web_main.app.state.bot = FakeBot()
+        pack_id = add_pack("Pack", "", 5, 10, 20, "packs/1/pack.zip")
+        form = {"pack_id": pack_id, "license_type": "producer", "init_data": "signed"}
+        first = client.post("/app/order", data=form).json()
+        second = client.post("/app/order", data=form).json()
+        web_main.app.state.bot = None
+
+    assert first["purchase_id"] == second["purchase_id"]
+    assert first["invoice_link"] == second["invoice_link"]
+    assert count_pending_outbox() == 0
+
+    asyncio.run(handle_successful_payment(_payment_message(7, f"link_{pack_id}_producer_10", 10)))
+    assert get_purchase_by_id(first["purchase_id"])["status"] == "completed"
+    # The buyer's download link and the admin notification.
+    assert count_pending_outbox() == 2
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
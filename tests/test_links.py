@@ -0,0 +1,42 @@
+from app import links
+from app.config import get_settings
+from app.database import get_signed_link, init_db
+from app.metrics import SIGNED_LINK_RENEWALS
+from app.s3_client import get_s3_client
+
+
+def test_free_pack_link_is_shared_until_it_needs_refreshing(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("FREE_PACK_LINK_TTL", "1000")
+    monkeypatch.setenv("FREE_PACK_REFRESH_FRACTION", "0.5")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    links._links.clear()
+    init_db()
+
+    now = 10_000.0
+    renewals = SIGNED_LINK_RENEWALS.value("free_pack")
+
+    url, expires_at = links.free_pack_link(now=now)
+    assert expires_at == 11_000.0
+    assert get_signed_link(get_settings().FREE_PACK_KEY)["url"] == url
+
+    signs = []
+    monkeypatch.setattr(get_s3_client(), "generate_download_url", lambda *args, **kwargs: signs.append(args) or "new")
+    now += 400
+    assert links.free_pack_link(now=now) == (url, expires_at)
+
+    links._links.clear()
+    assert links.free_pack_link(now=now) == (url, expires_at)
+    assert signs == []
+
+    now += 200
+    assert links.free_pack_link(now=now) == ("new", 11_600.0)
+    assert len(signs) == 1
+    assert SIGNED_LINK_RENEWALS.value("free_pack") == renewals + 2
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
@@ -0,0 +1,73 @@
+from urllib.parse import parse_qs, urlsplit
+
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.local_storage import LocalStorage
+from app.s3_client import IMMUTABLE_CACHE_CONTROL, get_s3_client
+
+
+def _local_storage(tmp_path, monkeypatch) -> LocalStorage:
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("PANEL_BASE_URL", "http://testserver")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+    storage = get_s3_client()
+    assert isinstance(storage, LocalStorage)
+    return storage
+
+
+def test_local_storage_roundtrip(tmp_path, monkeypatch):
+    storage = _local_storage(tmp_path, monkeypatch)
+
+    key = storage.upload_immutable(b"0123456789", "packs/1/demos", "mp3", "audio/mpeg")
+    assert storage.upload_immutable(b"0123456789", "packs/1/demos", "mp3", "audio/mpeg") == key
+    assert storage.object_exists(key)
+    assert storage.metadata(key) == {"content_type": "audio/mpeg", "cache_control": IMMUTABLE_CACHE_CONTROL}
+
+    assert storage.download_file(key) == b"0123456789"
+    assert list(storage.iter_chunks(key, chunk_size=4)) == [b"0123", b"4567", b"89"]
+    assert b"".join(storage.read_range(key, 3, 5)) == b"345"
+    with storage.spool_to_tempfile(key) as handle:
+        assert handle.read() == b"0123456789"
+
+    storage.delete_file(key)
+    assert not storage.object_exists(key)
+
+    for bad_key in ("../escape.txt", "packs/../../escape.txt", f"{key}.meta.json"):
+        try:
+            storage.path_for(bad_key)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad_key} was accepted")
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_local_storage_signed_route(tmp_path, monkeypatch):
+    storage = _local_storage(tmp_path, monkeypatch)
+    storage.upload_file(b"cover-bytes", "packs/1/cover/a.jpg", "image/jpeg")
+
+    from app.web.main import app
+
+    url = urlsplit(storage.generate_download_url("packs/1/cover/a.jpg", expires_in=60))
+    params = {k: v[0] for k, v in parse_qs(url.query).items()}
+    with TestClient(app) as client:
+        ok = client.get(url.path, params=params)
+        assert ok.status_code == 200
+        assert ok.content == b"cover-bytes"
+        assert ok.headers["content-type"] == "image/jpeg"
+
+        partial = client.get(url.path, params=params, headers={"Range": "bytes=0-4"})
+        assert partial.status_code == 206
+        assert partial.content == b"cover"
+
+        forged = client.get(url.path, params={**params, "signature": "0" * 64})
+        assert forged.status_code == 403
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
@@ -0,0 +1,103 @@
+import asyncio
+
+from aiogram import Bot, Router
+from aiogram.types import Update
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.bot.main import create_dispatcher
+from app.config import get_settings
+from app.database import add_pack, get_pack
+from app.s3_client import get_s3_client
+from app.web.main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    assert histogram.render().splitlines()[2:] == [
+        'test_latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_latency_seconds_bucket{route="/a",le="1"} 2',
+        'test_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_latency_seconds_sum{route="/a"} 5.55',
+        'test_latency_seconds_count{route="/a"} 3',
+    ]
+    metrics._registry.remove(histogram)
+
+
+def test_metrics_endpoint_reports_routes_database_and_bot(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("METRICS_TOKEN", "scrape")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+    with TestClient(app) as client:
+        pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+        before = metrics.HTTP_REQUEST_SECONDS.count("GET", "/api/packs/{pack_id}", "200")
+        assert client.get(f"/api/packs/{pack_id}").status_code == 200
+        assert metrics.HTTP_REQUEST_SECONDS.count("GET", "/api/packs/{pack_id}", "200") == before + 1
+
+        assert client.get("/metrics").status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/packs/{pack_id}",status="200"}' in body
+        assert 'sqlite_query_duration_seconds_count{statement="SELECT"}' in body
+        assert "sqlite_write_lock_wait_seconds_count" in body
+        assert 'cache_hit_ratio{cache="api_bodies"}' in body
+        assert 'queue_depth{queue="outbox"} 0' in body
+
+    router = Router(name="probe")
+
+    @router.message()
+    async def probe(message) -> None:
+        get_pack(pack_id)
+
+    dispatcher = create_dispatcher()
+    dispatcher.include_router(router)
+    update = Update.model_validate(
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 5, "type": "private"},
+                "from": {"id": 5, "is_bot": False, "first_name": "A"},
+                "text": "hello",
+            },
+        }
+    )
+    bot = Bot(token="42:TEST")
+    asyncio.run(dispatcher.feed_update(bot, update))
+    asyncio.run(bot.session.close())
+    assert metrics.BOT_HANDLER_SECONDS.count("probe", "message", "probe") == 1
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_bot_metrics_server_requires_token():
+    async def scrape(headers: str) -> bytes:
+        server = await metrics.serve("127.0.0.1", 0, "scrape")
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /metrics HTTP/1.1\r\nHost: bot\r\n{headers}\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    assert asyncio.run(scrape("")).startswith(b"HTTP/1.1 401")
+    assert asyncio.run(scrape("Authorization: Bearer wrong\r\n")).startswith(b"HTTP/1.1 401")
+    response = asyncio.run(scrape("authorization: Bearer scrape\r\n"))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert b"# TYPE http_request_duration_seconds histogram" in response
@@ -0,0 +1,67 @@
+import asyncio
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from app.config import get_settings
+from app.database import add_pack, add_purchase, count_pending_outbox, init_db
+from app.notifications import NotificationWorker, admin_outbox
+from app.telegram_sender import get_sender
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.flood_waited = False
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if chat_id == 1 and not self.flood_waited:
+            self.flood_waited = True
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0)
+        if chat_id == 2:
+            raise TelegramForbiddenError(method=method, message="bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+
+def test_notification_worker_drains_outbox(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    monkeypatch.setenv("NOTIFY_BATCH_SIZE", "2")
+    get_settings.cache_clear()
+    get_sender.cache_clear()
+    init_db()
+
+    pack_id = add_pack("Pack", "", 1, 2, 3, "packs/1/pack.zip")
+    purchase_id = add_purchase(12345, pack_id, "starter", 1, outbox=admin_outbox([3, 3]))
+
+    async def scenario():
+        bot = FakeBot()
+        worker = NotificationWorker(bot)
+        assert worker.enqueue("download_link", 1, "link", idempotency_key="download_link:1")
+        assert not worker.enqueue("download_link", 1, "link", idempotency_key="download_link:1")
+        assert worker.enqueue("download_link", 2, "blocked")
+        worker.start()
+        for _ in range(100):
+            if count_pending_outbox() == 0:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return bot, worker.snapshot()
+
+    bot, stats = asyncio.run(scenario())
+
+    assert (1, "link") in bot.sent
+    admin_messages = [text for chat_id, text in bot.sent if chat_id == 3]
+    assert len(admin_messages) == 1
+    assert f"New purchase #{purchase_id}" in admin_messages[0]
+    assert "Pack: Pack" in admin_messages[0]
+    assert stats["sent"] == 2
+    assert stats["retried"] == 0
+    assert stats["failed"] == 1
+    assert stats["duplicates"] == 1
+    assert stats["depth"] == 0
+    assert get_sender().snapshot()["retry_after"] == 1
+
+    get_settings.cache_clear()
+    get_sender.cache_clear()
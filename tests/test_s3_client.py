@@ -1,13 +1,26 @@
+import asyncio
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+
 from app.config import get_settings
-from app.s3_client import get_s3_client
+from app.s3_client import IMMUTABLE_CACHE_CONTROL, AsyncS3Client, get_s3_client
 
 
 class FakeS3Client:
     def __init__(self):
         self.storage = {}
+        self.meta = SimpleNamespace(events=HierarchicalEmitter())
 
-    def put_object(self, Bucket, Key, Body, ContentType):
-        self.storage[(Bucket, Key)] = {"Body": Body, "ContentType": ContentType}
+    def put_object(self, Bucket, Key, Body, ContentType, **kwargs):
+        self.storage[(Bucket, Key)] = {"Body": Body, "ContentType": ContentType, **kwargs}
+        self.put_count = getattr(self, "put_count", 0) + 1
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.storage:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
 
     def generate_presigned_url(self, method, Params, ExpiresIn):
         return f"https://example.local/{Params['Bucket']}/{Params['Key']}?exp={ExpiresIn}"
@@ -15,18 +28,29 @@ class FakeS3Client:
     def delete_object(self, Bucket, Key):
         self.storage.pop((Bucket, Key), None)
 
-    def get_object(self, Bucket, Key):
+    def get_object(self, Bucket, Key, Range=None):
         body = self.storage[(Bucket, Key)]["Body"]
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            body = body[int(start) : int(end) + 1 if end else None]
         return {"Body": _Reader(body)}
 
 
 class _Reader:
     def __init__(self, value: bytes):
         self.value = value
+        self.closed = False
 
     def read(self):
         return self.value
 
+    def iter_chunks(self, chunk_size):
+        for idx in range(0, len(self.value), chunk_size):
+            yield self.value[idx : idx + chunk_size]
+
+    def close(self):
+        self.closed = True
+
 
 def test_s3_client_with_mock(monkeypatch):
     fake_client = FakeS3Client()
@@ -56,3 +80,93 @@ def test_s3_client_with_mock(monkeypatch):
 
     s3.delete_file(key)
     assert ("bucket", key) not in fake_client.storage
+
+
+def test_s3_client_immutable_upload_dedup(monkeypatch):
+    fake_client = FakeS3Client()
+
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    monkeypatch.setenv("S3_PUBLIC_BASE_URL", "https://cdn.local/")
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+    import app.s3_client as s3_module
+
+    monkeypatch.setattr(s3_module.boto3, "client", lambda *args, **kwargs: fake_client)
+
+    s3 = get_s3_client()
+
+    first = s3.upload_immutable(b"cover", "packs/1/cover", "JPG", "image/jpeg")
+    second = s3.upload_immutable(b"cover", "packs/1/cover", "jpg", "image/jpeg")
+    other = s3.upload_immutable(b"other", "packs/1/cover", "jpg", "image/jpeg")
+
+    assert first == second
+    assert first.startswith("packs/1/cover/") and first.endswith(".jpg")
+    assert other != first
+    assert fake_client.put_count == 2
+    assert fake_client.storage[("bucket", first)]["CacheControl"] == IMMUTABLE_CACHE_CONTROL
+    assert s3.public_url(first) == f"https://cdn.local/bucket/{first}"
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_s3_client_streaming_reads(monkeypatch):
+    fake_client = FakeS3Client()
+
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+    import app.s3_client as s3_module
+
+    monkeypatch.setattr(s3_module.boto3, "client", lambda *args, **kwargs: fake_client)
+
+    s3 = get_s3_client()
+    s3.upload_file(b"0123456789", "packs/1/demos/a.mp3", "audio/mpeg")
+
+    assert list(s3.iter_chunks("packs/1/demos/a.mp3", chunk_size=4)) == [b"0123", b"4567", b"89"]
+    assert b"".join(s3.read_range("packs/1/demos/a.mp3", 2, 5)) == b"2345"
+    assert b"".join(s3.read_range("packs/1/demos/a.mp3", 7)) == b"789"
+
+    with s3.spool_to_tempfile("packs/1/demos/a.mp3", max_memory=4) as spool:
+        assert spool.read() == b"0123456789"
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+
+def test_async_s3_client_runs_on_pool(monkeypatch):
+    fake_client = FakeS3Client()
+
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    monkeypatch.setenv("S3_MAX_POOL_CONNECTIONS", "4")
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+    import app.s3_client as s3_module
+
+    monkeypatch.setattr(s3_module.boto3, "client", lambda *args, **kwargs: fake_client)
+
+    s3 = AsyncS3Client(get_s3_client())
+
+    async def scenario():
+        await asyncio.gather(*(s3.upload_file(b"x" * idx, f"k{idx}", "audio/mpeg") for idx in range(1, 9)))
+        chunks = [chunk async for chunk in s3.iter_chunks("k8", chunk_size=3)]
+        url = await s3.generate_download_url("k8", expires_in=60)
+        await s3.delete_file("k8")
+        return chunks, url
+
+    chunks, url = asyncio.run(scenario())
+    s3.shutdown()
+
+    assert chunks == [b"xxx", b"xxx", b"xx"]
+    assert "exp=60" in url
+    assert len(fake_client.storage) == 7
+    assert s3._executor._max_workers == 4
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
@@ -0,0 +1,45 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.s3_client import IMMUTABLE_CACHE_CONTROL, get_s3_client
+from app.web.main import app
+
+
+def test_fingerprinted_static_and_compression(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "storage"))
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
+
+    with TestClient(app) as client:
+        page = client.get("/app", headers={"Accept-Encoding": "gzip"})
+        assert page.headers["content-encoding"] == "gzip"
+        script_url = re.search(r'src="(/static/tgapp\.[0-9a-f]{12}\.js)"', page.text).group(1)
+
+        script = client.get(script_url, headers={"Accept-Encoding": "gzip"})
+        assert script.status_code == 200
+        assert script.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert script.headers["content-encoding"] == "gzip"
+        with open("app/web/static/tgapp.js", "rb") as handle:
+            assert script.content == handle.read()
+
+        revalidated = client.get(script_url, headers={"If-None-Match": script.headers["etag"]})
+        assert revalidated.status_code == 304
+
+        plain = client.get("/static/tgapp.js", headers={"Accept-Encoding": "identity"})
+        assert plain.status_code == 200
+        assert plain.headers["cache-control"] == "no-cache"
+
+        storage = get_s3_client()
+        key = storage.upload_file(b"x" * 4096, "packs/1/demo.mp3", "audio/mpeg")
+        audio = client.get(storage.generate_download_url(key), headers={"Accept-Encoding": "gzip"})
+        assert audio.status_code == 200
+        assert "content-encoding" not in audio.headers
+
+    get_settings.cache_clear()
+    get_s3_client.cache_clear()
@@ -0,0 +1,50 @@
+import asyncio
+
+from app.config import get_settings
+from app.telegram_sender import INFORMATIONAL, TRANSACTIONAL, TelegramSender, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+
+    assert bucket.try_take(now) == 0
+    assert bucket.try_take(now) == 0
+    assert round(bucket.try_take(now), 3) == 0.1
+    assert bucket.try_take(now + 0.1) == 0
+    assert round(bucket.reserve(now + 0.1), 3) == 0.1
+
+
+def test_sender_prioritises_transactional_messages(monkeypatch):
+    monkeypatch.setenv("TG_GLOBAL_RATE", "50")
+    monkeypatch.setenv("TG_GLOBAL_BURST", "1")
+    monkeypatch.setenv("TG_CHAT_RATE", "1000")
+    monkeypatch.setenv("TG_CHAT_BURST", "1000")
+    get_settings.cache_clear()
+
+    order = []
+
+    async def scenario():
+        sender = TelegramSender()
+
+        async def record(label):
+            order.append(label)
+
+        tasks = [
+            asyncio.create_task(sender.send(idx, lambda idx=idx: record(f"info-{idx}"), priority=INFORMATIONAL))
+            for idx in range(4)
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(sender.send(99, lambda: record("link"), priority=TRANSACTIONAL)))
+        await asyncio.gather(*tasks)
+        return sender.snapshot()
+
+    stats = asyncio.run(scenario())
+
+    assert order[0] == "info-0"
+    assert order.index("link") == 1
+    assert stats["sent"] == 5
+    assert stats["sent_transactional"] == 1
+    assert stats["throttled"] >= 3
+
+    get_settings.cache_clear()
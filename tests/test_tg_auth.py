@@ -0,0 +1,40 @@
+import hashlib
+import hmac
+import json
+from urllib.parse import urlencode
+
+from app.web import tg_auth
+from app.web.tg_auth import parse_and_validate_init_data
+
+BOT_TOKEN = "42:TEST"
+
+
+def _init_data(user_id: int, auth_date: int) -> str:
+    pairs = {"auth_date": str(auth_date), "user": json.dumps({"id": user_id})}
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(pairs.items()))
+    secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode("utf-8"), hashlib.sha256).digest()
+    pairs["hash"] = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    return urlencode(pairs)
+
+
+def test_init_data_is_cached_until_auth_date_expires(monkeypatch):
+    tg_auth._validated_init_data.clear()
+    now = 1_700_000_000
+    init_data = _init_data(7, now)
+
+    payload = parse_and_validate_init_data(init_data, BOT_TOKEN, now=now)
+    assert payload["user_id"] == 7
+
+    def fail(*args):
+        raise AssertionError("cached init_data must not be re-validated")
+
+    monkeypatch.setattr(tg_auth, "_validate_init_data", fail)
+    assert parse_and_validate_init_data(init_data, BOT_TOKEN, now=now) is payload
+    monkeypatch.undo()
+
+    assert parse_and_validate_init_data(init_data + "0", BOT_TOKEN, now=now) is None
+    assert parse_and_validate_init_data(init_data, "43:OTHER", now=now) is None
+
+    almost_expired = _init_data(8, now - 100)
+    assert parse_and_validate_init_data(almost_expired, BOT_TOKEN, max_age_seconds=101, now=now)["user_id"] == 8
+    assert parse_and_validate_init_data(almost_expired, BOT_TOKEN, max_age_seconds=101, now=now + 2.1) is None
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+
+from app.bot.main import get_webhook_secret
+from app.config import get_settings
+from app.web.main import app
+
+
+def test_webhook_feeds_dispatcher(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+
+    received = []
+    router = Router()
+
+    @router.message()
+    async def record(message: Message) -> None:
+        received.append((message.chat.id, message.text))
+
+    update = {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 5, "type": "private"},
+            "from": {"id": 5, "is_bot": False, "first_name": "A"},
+            "text": "hi",
+        },
+    }
+    path = get_settings().WEBHOOK_PATH
+
+    with TestClient(app) as client:
+        assert client.post(path, json=update).status_code == 404
+
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        app.state.bot = bot = Bot(token="42:TEST")
+        app.state.dispatcher = dispatcher
+
+        assert get_webhook_secret() == "s3cret"
+        assert client.post(path, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": "nope"}).status_code == 401
+        response = client.post(path, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"})
+        assert response.status_code == 200
+
+        for _ in range(100):
+            if received:
+                break
+            time.sleep(0.01)
+
+    asyncio.run(bot.session.close())
+    assert received == [(5, "hi")]
+    get_settings.cache_clear()
+
+
+def test_webhook_sheds_updates_when_saturated(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("BOT_TOKEN", "")
+    monkeypatch.setenv("WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setenv("WEBHOOK_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("ADMIN_IDS", "[]")
+    get_settings.cache_clear()
+    monkeypatch.setattr("app.web.main.settings", get_settings())
+
+    started, released = [], []
+    router = Router()
+
+    @router.message()
+    async def slow(message: Message) -> None:
+        started.append(message.message_id)
+        while not released:
+            await asyncio.sleep(0.01)
+
+    def update(update_id: int) -> dict:
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": 5, "type": "private"},
+                "from": {"id": 5, "is_bot": False, "first_name": "A"},
+                "text": "hi",
+            },
+        }
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+    path = get_settings().WEBHOOK_PATH
+
+    with TestClient(app) as client:
+        dispatcher = Dispatcher()
+        dispatcher.include_router(router)
+        app.state.bot = bot = Bot(token="42:TEST")
+        app.state.dispatcher = dispatcher
+
+        assert client.post(path, json=update(1), headers=headers).status_code == 200
+        assert client.post(path, json=update(2), headers=headers).status_code == 503
+        released.append(True)
+        for _ in range(100):
+            if not app.state.webhook_tasks:
+                break
+            time.sleep(0.01)
+        assert client.post(path, json=update(3), headers=headers).status_code == 200
+
+    asyncio.run(bot.session.close())
+    assert started[:2] == [1, 3]
+    get_settings.cache_clear()